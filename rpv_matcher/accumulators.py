@@ -0,0 +1,204 @@
+#########################################################################
+# Purpose: Mergeable summaries of matching decisions filled while       #
+#          matching (efficiencies, composition, neutralino fractions)   #
+# Date:   19 October 2026                                               #
+#########################################################################
+
+import sys
+import json
+import logging
+import numpy as np
+from typing import List
+
+from rpv_matcher.rpv_matcher import RPVJet
+from rpv_matcher.rpv_matcher import RPVParton
+from rpv_matcher.rpv_matcher import MATCHING_PROPERTIES_DEFAULTS
+
+
+def get_matching_config(properties: dict) -> dict:
+    """ Values of all properties setting the matching decisions (defaults if not provided) """ # noqa
+    return {
+        key: properties.get(key, default)
+        for key, default in MATCHING_PROPERTIES_DEFAULTS.items()
+        }
+
+
+class MatchingSummary():
+    """
+    Counters and fixed-bin histograms summarizing matching decisions
+
+    The summary is keyed by the matcher configuration (properties setting
+    the matching decisions, see get_matching_config()), taken from the
+    matcher it is attached to. If config is provided, attaching the summary
+    to a matcher with another configuration exits.
+    Histograms are binned in number of jets (or matched jets) per event,
+    from 0 to max_n_jets (last bin includes overflow).
+    Summaries filled with the same configuration can be merged (e.g. across
+    chunks, workers or shards) and written to/read from JSON.
+    Usage: matcher.add_accumulator(summary)
+    """
+    __counters = (
+        'events',
+        'events_all_partons_matched',
+        'jets',
+        'matched_jets',
+        'parton_matched_jets',
+        'fsr_matched_jets',
+        'neutralino_matched_jets',
+        )
+    __histograms = (
+        'events_vs_n_jets',
+        'jets_vs_n_jets',
+        'matched_jets_vs_n_jets',
+        'events_vs_n_matched_jets',
+        )
+
+    def __init__(self, config: dict = None, max_n_jets: int = 20):
+        self.__log = logging.getLogger()
+        self.__config = json.dumps(get_matching_config(config if config else {}), sort_keys=True) # noqa
+        self.__config_fixed = config is not None
+        self.__max_n_jets = max_n_jets
+        self.__counts = {counter: 0 for counter in self.__counters}
+        for histogram in self.__histograms:
+            self.__counts[histogram] = [0] * (max_n_jets + 1)
+
+    def get_config(self) -> dict:
+        return json.loads(self.__config)
+
+    def set_config(self, properties: dict):
+        """
+        Set configuration from the properties of the matcher filling the summary
+        (exit if it differs from the one provided or used to fill the summary)
+        """
+        config = json.dumps(get_matching_config(properties), sort_keys=True)
+        if config == self.__config:
+            return
+        if self.__config_fixed or self.__counts['events']:
+            self.__log.fatal(f'Summary configuration ({self.__config}) differs from the one of the matcher ({config}), exiting') # noqa
+            sys.exit(1)
+        self.__config = config
+
+    def get(self, name: str):
+        """ Get a counter or a histogram (list of bin contents) """
+        return self.__counts[name]
+
+    def fill(self, jets: [RPVJet], partons: [RPVParton]):
+        """ Fill with the (already matched) jets of an event """
+        n_jets = len(jets)
+        n_matched = 0
+        matched_partons = set()
+        counts = self.__counts
+        for jet in jets:
+            if not jet.is_matched():
+                continue
+            n_matched += 1
+            if jet.get_match_type() == 'Parton':
+                counts['parton_matched_jets'] += 1
+                matched_partons.add(jet.get_match_parton_index())
+            else:
+                counts['fsr_matched_jets'] += 1
+            if jet.is_matched_to_neutralino():
+                counts['neutralino_matched_jets'] += 1
+        counts['events'] += 1
+        counts['events_all_partons_matched'] += len(matched_partons) == len(partons) # noqa
+        counts['jets'] += n_jets
+        counts['matched_jets'] += n_matched
+        n_jets_bin = min(n_jets, self.__max_n_jets)
+        counts['events_vs_n_jets'][n_jets_bin] += 1
+        counts['jets_vs_n_jets'][n_jets_bin] += n_jets
+        counts['matched_jets_vs_n_jets'][n_jets_bin] += n_matched
+        counts['events_vs_n_matched_jets'][min(n_matched, self.__max_n_jets)] += 1 # noqa
+
+    def fill_batch(self, batch, result):
+        """ Fill with all events of an RPVEventBatch and its RPVBatchResult """
+        from rpv_matcher.batched import MATCH_PARTON, MATCH_FSR
+        from rpv_matcher.batched import get_event_index
+        n_events = batch.get_n_events()
+        n_jets = np.diff(batch.jet_offsets)
+        n_partons = np.diff(batch.parton_offsets)
+        jet_event = get_event_index(batch.jet_offsets)
+        matched = result.is_matched()
+        is_parton = result.match_type == MATCH_PARTON
+        n_matched = np.bincount(jet_event[matched], minlength=n_events)
+        # number of different partons matched in every event
+        keys = np.unique(jet_event[is_parton] * (int(n_partons.max(initial=0)) + 1) + result.parton_index[is_parton]) # noqa
+        n_matched_partons = np.bincount(keys // (int(n_partons.max(initial=0)) + 1), minlength=n_events) # noqa
+        counts = self.__counts
+        counts['events'] += n_events
+        counts['events_all_partons_matched'] += int((n_matched_partons == n_partons).sum()) # noqa
+        counts['jets'] += int(len(matched))
+        counts['matched_jets'] += int(matched.sum())
+        counts['parton_matched_jets'] += int(is_parton.sum())
+        counts['fsr_matched_jets'] += int((result.match_type == MATCH_FSR).sum()) # noqa
+        counts['neutralino_matched_jets'] += int((matched & result.neutralino).sum()) # noqa
+        n_bins = self.__max_n_jets + 1
+        n_jets_bin = np.minimum(n_jets, self.__max_n_jets)
+        histograms = {
+            'events_vs_n_jets': np.bincount(n_jets_bin, minlength=n_bins),
+            'jets_vs_n_jets': np.bincount(n_jets_bin, weights=n_jets, minlength=n_bins), # noqa
+            'matched_jets_vs_n_jets': np.bincount(n_jets_bin, weights=n_matched, minlength=n_bins), # noqa
+            'events_vs_n_matched_jets': np.bincount(np.minimum(n_matched, self.__max_n_jets), minlength=n_bins), # noqa
+            }
+        for name, values in histograms.items():
+            counts[name] = [int(a + b) for a, b in zip(counts[name], values)]
+
+    def merge(self, other):
+        """ Add counts of another summary (filled with the same configuration) """ # noqa
+        if other.__config != self.__config or other.__max_n_jets != self.__max_n_jets: # noqa
+            self.__log.fatal('Summaries with different configurations can not be merged, exiting') # noqa
+            sys.exit(1)
+        for name in self.__counters:
+            self.__counts[name] += other.__counts[name]
+        for name in self.__histograms:
+            self.__counts[name] = [a + b for a, b in zip(self.__counts[name], other.__counts[name])] # noqa
+        return self
+
+    def get_summary(self) -> dict:
+        """ Fractions derived from the counts """
+        counts = self.__counts
+
+        def ratio(a, b):
+            return a / b if b else 0.0
+        return {
+            'all_partons_matched_fraction': ratio(counts['events_all_partons_matched'], counts['events']), # noqa
+            'matched_jet_fraction': ratio(counts['matched_jets'], counts['jets']), # noqa
+            'parton_fraction': ratio(counts['parton_matched_jets'], counts['matched_jets']), # noqa
+            'fsr_fraction': ratio(counts['fsr_matched_jets'], counts['matched_jets']), # noqa
+            'neutralino_fraction': ratio(counts['neutralino_matched_jets'], counts['matched_jets']), # noqa
+            'match_rate_vs_n_jets': [ratio(a, b) for a, b in zip(counts['matched_jets_vs_n_jets'], counts['jets_vs_n_jets'])], # noqa
+            }
+
+    def to_dict(self) -> dict:
+        return {
+            'config': self.get_config(),
+            'max_n_jets': self.__max_n_jets,
+            'counts': {name: list(value) if name in self.__histograms else value for name, value in self.__counts.items()}, # noqa
+            }
+
+    @classmethod
+    def from_dict(cls, info: dict):
+        summary = cls(info['config'], info['max_n_jets'])
+        for name, value in info['counts'].items():
+            summary.__counts[name] = list(value) if name in cls.__histograms else value # noqa
+        return summary
+
+    def save(self, file_name: str):
+        with open(file_name, 'w') as ofile:
+            json.dump(self.to_dict(), ofile)
+
+    @classmethod
+    def load(cls, file_name: str):
+        with open(file_name, 'r') as ifile:
+            return cls.from_dict(json.load(ifile))
+
+
+def merge_summaries(summaries: List[MatchingSummary]) -> dict:
+    """ Merge summaries with the same configuration (-> {config (JSON): summary}) """ # noqa
+    merged = {}
+    for summary in summaries:
+        key = json.dumps(summary.get_config(), sort_keys=True)
+        if key not in merged:
+            merged[key] = MatchingSummary.from_dict(summary.to_dict())
+        else:
+            merged[key].merge(summary)
+    return merged
@@ -0,0 +1,784 @@
+#########################################################################
+# Purpose: Match jets to partons for whole chunks of events stored as   #
+#          flat (columnar) numpy arrays                                 #
+# Date:   19 October 2026                                               #
+#########################################################################
+
+import sys
+import copy
+import json
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Union
+
+from rpv_matcher.rpv_matcher import MATCHING_PROPERTIES_DEFAULTS
+from rpv_matcher.events import JET_FIELDS
+from rpv_matcher.events import FSR_FIELDS
+from rpv_matcher.events import PARTON_FIELDS
+from rpv_matcher.events import NOT_MATCHED
+from rpv_matcher.events import EXIT
+from rpv_matcher.events import MATCH_TYPES
+from rpv_matcher.events import INPUT_DEFAULTS
+
+# Match types are stored as integer codes (index in MATCH_TYPES)
+MATCH_NONE = 0
+MATCH_PARTON = 1
+MATCH_FSR = 2
+
+INT32_MIN = -2**31
+
+# Types used to store batched inputs and outputs
+# 'Default': same precision as RPVMatcher
+# 'Compact': float32 kinematics and narrow integers (about half the memory)
+DTYPE_POLICIES = {
+    'Default': {
+        'kinematics': np.float64,
+        'barcode': np.int64,
+        'pdgid': np.int64,
+        'index': np.int64,
+        'match_type': np.uint8,
+        },
+    'Compact': {
+        'kinematics': np.float32,
+        'barcode': np.int32,
+        'pdgid': np.int16,
+        'index': np.int16,
+        'match_type': np.uint8,
+        },
+    }
+KINEMATICS = ('pt', 'eta', 'phi', 'e')
+
+# Storing eta and phi as float32 changes them by up to ~2E-7 (relative
+# precision of float32 for |value| < pi). Computations are always done in
+# float64, so DeltaR values differ from the ones obtained with float64 inputs
+# by less than this tolerance (< 3E-7 observed). Decisions depending on
+# DeltaR differences smaller than this (w.r.t. DeltaRcut or between two
+# candidates) can change with the 'Compact' policy
+# (see measure_precision_effects())
+COMPACT_DELTAR_TOLERANCE = 1E-6
+
+# Vectorized numpy versions of sinh, log and arctan2 can differ by one ulp from
+# the libm ones used by TLorentzVector, so recomputed DeltaR values can differ
+# from the RPVMatcher ones: by ~1E-15 for central objects, but the eta
+# difference grows as cosh(eta)^2 (up to ~5E-10 for |eta| ~ 8, see
+# get_eta_tolerance()). Events where a decision depends on a DeltaR difference
+# smaller than DELTAR_TIE_TOLERANCE plus the eta tolerance of the objects
+# involved (w.r.t. DeltaRcut or between two candidates) are matched again
+# with RPVMatcher
+DELTAR_TIE_TOLERANCE = 1E-12
+
+
+def get_offsets(counts) -> np.ndarray:
+    """ Get event offsets from number of objects per event """
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+def get_event_index(offsets: np.ndarray) -> np.ndarray:
+    """ Get index of the event of every object """
+    return np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets)) # noqa
+
+
+def join_keys(event_index_a: np.ndarray, barcode_a: np.ndarray, event_index_b: np.ndarray, barcode_b: np.ndarray) -> Tuple:  # -> ("keys_a", "keys_b") # noqa
+    """
+    int64 keys for the (event, barcode) pairs of two collections, equal if
+    and only if the pairs are equal (barcodes not fitting in 32 bits are
+    replaced by their rank among all barcodes, which needs an extra sort)
+    """
+    barcodes = np.concatenate([barcode_a, barcode_b]).astype(np.int64)
+    if not len(barcodes) or (barcodes.min() >= INT32_MIN and barcodes.max() < -INT32_MIN): # noqa
+        offset, n_barcodes = barcodes - INT32_MIN, 2**32
+    else:
+        unique, offset = np.unique(barcodes, return_inverse=True)
+        offset, n_barcodes = offset.reshape(-1), len(unique)
+    keys = np.concatenate([event_index_a, event_index_b]).astype(np.int64) * n_barcodes + offset # noqa
+    return keys[:len(barcode_a)], keys[len(barcode_a):]
+
+
+def lookup(table_keys: np.ndarray, query_keys: np.ndarray) -> Tuple:  # -> ("found", "table_index") # noqa
+    """
+    Find query keys in a table of keys (sorted-key join)
+    The first table entry is returned if a key is duplicated
+    """
+    if not len(table_keys):
+        return np.zeros(len(query_keys), dtype=bool), np.zeros(len(query_keys), dtype=np.int64) # noqa
+    order = np.argsort(table_keys, kind='stable')
+    sorted_keys = table_keys[order]
+    position = np.minimum(np.searchsorted(sorted_keys, query_keys, side='left'), len(sorted_keys) - 1) # noqa
+    found = sorted_keys[position] == query_keys
+    return found, order[position]
+
+
+def get_dtype(field: str, dtype_policy: str):
+    """ Type used to store a field (see DTYPE_POLICIES) """
+    if dtype_policy not in DTYPE_POLICIES:
+        logging.getLogger().fatal(f'dtype policy {dtype_policy} was not recognized (options: {", ".join(DTYPE_POLICIES)}), exiting') # noqa
+        sys.exit(1)
+    if field in KINEMATICS:
+        return DTYPE_POLICIES[dtype_policy]['kinematics']
+    if field in ('pdgid', 'match_type', 'index'):
+        return DTYPE_POLICIES[dtype_policy][field]
+    return DTYPE_POLICIES[dtype_policy]['barcode']
+
+
+def cast(values, field: str, dtype_policy: str) -> np.ndarray:
+    """ Cast values to the type of field (exit if integers do not fit) """
+    dtype = get_dtype(field, dtype_policy)
+    values = np.asarray(values)
+    if np.issubdtype(dtype, np.integer) and len(values) and values.dtype != dtype: # noqa
+        info = np.iinfo(dtype)
+        if values.min() < info.min or values.max() > info.max:
+            logging.getLogger().fatal(f'{field} values do not fit in {np.dtype(dtype).name} ({dtype_policy} dtype policy), exiting') # noqa
+            sys.exit(1)
+    return values.astype(dtype, copy=False)
+
+
+def get_pairs(offsets_a: np.ndarray, offsets_b: np.ndarray) -> Tuple:  # -> ("index_a", "index_b") # noqa
+    """ Indexes of all (a, b) pairs of objects from the same event """
+    event_a = get_event_index(offsets_a)
+    n_pairs = np.diff(offsets_b)[event_a]
+    index_a = np.repeat(np.arange(len(event_a), dtype=np.int64), n_pairs)
+    first_pair = get_offsets(n_pairs)[:-1]
+    position = np.arange(len(index_a), dtype=np.int64) - np.repeat(first_pair, n_pairs) # noqa
+    index_b = offsets_b[event_a][index_a] + position
+    return index_a, index_b
+
+
+def get_eta_tolerance(eta: np.ndarray) -> np.ndarray:
+    """
+    Bound on the difference between tlv_eta_phi() and TLorentzVector::Eta()
+    (cos(theta) = pz/mag can be rounded to a neighbouring float64 when sinh
+    differs by one ulp, and d(eta)/d(cos(theta)) = cosh(eta)^2)
+    """
+    with np.errstate(over='ignore'):
+        return 4 * np.finfo(np.float64).eps * np.cosh(np.asarray(eta, dtype=np.float64)) ** 2 # noqa
+
+
+def tlv_eta_phi(pt: np.ndarray, eta: np.ndarray, phi: np.ndarray) -> Tuple:  # -> ("eta", "phi") # noqa
+    """ Eta() and Phi() of a TLorentzVector set with SetPtEtaPhiE() (recomputed from px, py and pz) """ # noqa
+    pt, eta, phi = [np.asarray(values, dtype=np.float64) for values in (pt, eta, phi)] # noqa
+    px = pt * np.cos(phi)
+    py = pt * np.sin(phi)
+    pz = pt * np.sinh(eta)
+    mag = np.sqrt(px * px + py * py + pz * pz)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_theta = np.where(mag == 0, 1, pz / mag)
+        tlv_eta = np.where(
+            cos_theta * cos_theta < 1,
+            -0.5 * np.log((1 - cos_theta) / (1 + cos_theta)),
+            np.where(pz == 0, 0, np.where(pz > 0, 10e10, -10e10))
+            )
+    tlv_phi = np.where((px == 0) & (py == 0), 0, np.arctan2(py, px))
+    return tlv_eta, tlv_phi
+
+
+def delta_r(eta_a: np.ndarray, phi_a: np.ndarray, eta_b: np.ndarray, phi_b: np.ndarray) -> np.ndarray: # noqa
+    """ DeltaR as computed by TLorentzVector::DeltaR() """
+    deta = eta_a - eta_b
+    dphi = phi_a - phi_b
+    dphi = np.where(dphi >= np.pi, dphi - 2 * np.pi, np.where(dphi < -np.pi, dphi + 2 * np.pi, dphi)) # noqa
+    return np.sqrt(deta * deta + dphi * dphi)
+
+
+def tlv_pt(pt: np.ndarray, phi: np.ndarray) -> np.ndarray:
+    """ Pt() of a TLorentzVector set with SetPtEtaPhiE() (recomputed from px and py) """ # noqa
+    pt, phi = np.asarray(pt, dtype=np.float64), np.asarray(phi, dtype=np.float64) # noqa
+    px = pt * np.cos(phi)
+    py = pt * np.sin(phi)
+    return np.sqrt(px * px + py * py)
+
+
+def to_dense(values: np.ndarray, offsets: np.ndarray, fill) -> np.ndarray:
+    """ (n_events, max_n_objects) array with the values of every event (padded with fill) """ # noqa
+    counts = np.diff(offsets)
+    dense = np.full((len(counts), int(counts.max(initial=0))), fill, dtype=values.dtype) # noqa
+    event = get_event_index(offsets)
+    dense[event, np.arange(len(values), dtype=np.int64) - offsets[event]] = values # noqa
+    return dense
+
+
+def get_closest(eta: np.ndarray, phi: np.ndarray, dense_eta: np.ndarray, dense_phi: np.ndarray, candidates: np.ndarray) -> Tuple:  # -> ("index", "dr_min", "dr_next") # noqa
+    """
+    Find closest candidate (first one in case of equal DeltaR values) to every
+    object (one row of dense candidate arrays per object) and the DeltaR value
+    of the next closest one
+    """
+    dr = delta_r(eta[:, None], phi[:, None], dense_eta, dense_phi)
+    dr = np.where(candidates & ~np.isnan(dr), dr, np.inf)
+    rows = np.arange(len(dr))
+    index = np.argmin(dr, axis=1)
+    dr_min = dr[rows, index]
+    dr[rows, index] = np.inf
+    return index, dr_min, dr.min(axis=1, initial=np.inf)
+
+
+def get_deltar_tolerance(jet_tolerance: np.ndarray, dense_tolerance: np.ndarray, candidates: np.ndarray) -> np.ndarray: # noqa
+    """
+    Bound on the difference between recomputed and RPVMatcher DeltaR values
+    (or differences of two of them) of every jet and its candidates
+    (one row of dense candidate arrays per jet, see get_eta_tolerance())
+    """
+    candidate_tolerance = np.where(candidates, dense_tolerance, 0).max(axis=1, initial=0) # noqa
+    return DELTAR_TIE_TOLERANCE + 2 * (jet_tolerance + candidate_tolerance)
+
+
+def is_ambiguous(dr_min: np.ndarray, dr_next: np.ndarray, dr_cut: float, tolerance: np.ndarray) -> np.ndarray: # noqa
+    """ Check if the closest candidate or the DeltaRcut decision is within tolerance (see get_deltar_tolerance()) """ # noqa
+    with np.errstate(invalid='ignore'):  # no candidates (inf - inf)
+        close_to_cut = np.abs(dr_min - dr_cut) < tolerance
+        close_candidates = (dr_next - dr_min < tolerance) & (dr_min < dr_cut + tolerance) # noqa
+    return close_to_cut | close_candidates
+
+
+class RPVEventBatch():
+    """
+    Inputs of a chunk of events
+
+    Every collection (jets, partons, fsrs) is a dict of flat arrays (one entry
+    per object, see the *_FIELDS in events.py) and the objects of event i are
+    [offsets[i], offsets[i+1]).
+    """
+    def __init__(
+            self,
+            jets: dict,
+            jet_offsets,
+            partons: dict,
+            parton_offsets,
+            fsrs: dict = None,
+            fsr_offsets=None,
+            dtype_policy: str = 'Default'
+            ):
+        self.dtype_policy = dtype_policy
+        self.jet_offsets = np.asarray(jet_offsets, dtype=np.int64)
+        self.parton_offsets = np.asarray(parton_offsets, dtype=np.int64)
+        n_events = len(self.jet_offsets) - 1
+        if fsrs is None:
+            fsrs = {}
+            fsr_offsets = np.zeros(n_events + 1, dtype=np.int64)
+        self.fsr_offsets = np.asarray(fsr_offsets, dtype=np.int64)
+        self.jets = self.__get_arrays(jets, JET_FIELDS, self.jet_offsets, 'jet', dtype_policy) # noqa
+        self.partons = self.__get_arrays(partons, PARTON_FIELDS, self.parton_offsets, 'parton', dtype_policy) # noqa
+        self.fsrs = self.__get_arrays(fsrs, FSR_FIELDS, self.fsr_offsets, 'FSR', dtype_policy) # noqa
+        if len(self.parton_offsets) - 1 != n_events or len(self.fsr_offsets) - 1 != n_events: # noqa
+            logging.getLogger().fatal('jets, partons and FSRs are provided for a different number of events, exiting') # noqa
+            sys.exit(1)
+
+    @staticmethod
+    def __get_arrays(collection: dict, fields: Tuple, offsets: np.ndarray, name: str, dtype_policy: str) -> dict: # noqa
+        n_objects = offsets[-1]
+        arrays = {}
+        for field in fields:
+            if field in collection:
+                arrays[field] = cast(collection[field], field, dtype_policy)
+            elif field in INPUT_DEFAULTS or not n_objects:
+                default = INPUT_DEFAULTS.get(field, -999)
+                arrays[field] = np.full(n_objects, default, dtype=get_dtype(field, dtype_policy)) # noqa
+            else:
+                logging.getLogger().fatal(f'{field} not provided for {name}s, exiting') # noqa
+                sys.exit(1)
+            if len(arrays[field]) != n_objects:
+                logging.getLogger().fatal(f'{name} {field} has {len(arrays[field])} entries but offsets expect {n_objects}, exiting') # noqa
+                sys.exit(1)
+        return arrays
+
+    @classmethod
+    def from_events(cls, events: List[dict], dtype_policy: str = 'Default'):
+        """ Construct batch from plain events (see events.py) """
+        def collection(key, fields):
+            objects = [info for event in events for info in event[key]]
+            arrays = {}
+            for field in fields:
+                values = [info.get(field, INPUT_DEFAULTS.get(field, -999)) for info in objects] # noqa
+                dtype = np.float64 if field in KINEMATICS else np.int64
+                arrays[field] = np.array(values, dtype=dtype)
+            return arrays, get_offsets([len(event[key]) for event in events])
+        jets, jet_offsets = collection('jets', JET_FIELDS)
+        partons, parton_offsets = collection('partons', PARTON_FIELDS)
+        fsrs, fsr_offsets = collection('fsrs', FSR_FIELDS)
+        return cls(jets, jet_offsets, partons, parton_offsets, fsrs, fsr_offsets, dtype_policy) # noqa
+
+    def astype(self, dtype_policy: str):
+        """ Get a copy of the batch stored with another dtype policy """
+        return RPVEventBatch(
+            self.jets,
+            self.jet_offsets,
+            self.partons,
+            self.parton_offsets,
+            self.fsrs,
+            self.fsr_offsets,
+            dtype_policy
+            )
+
+    def get_n_events(self) -> int:
+        return len(self.jet_offsets) - 1
+
+    def get_events(self, first: int, last: int):
+        """ Get batch with events [first, last) sharing the arrays of this batch """ # noqa
+        def collection(arrays, offsets):
+            return (
+                {field: values[offsets[first]:offsets[last]] for field, values in arrays.items()}, # noqa
+                offsets[first:last + 1] - offsets[first],
+                )
+        return RPVEventBatch(
+            *collection(self.jets, self.jet_offsets),
+            *collection(self.partons, self.parton_offsets),
+            *collection(self.fsrs, self.fsr_offsets),
+            self.dtype_policy
+            )
+
+    def get_nbytes(self) -> int:
+        """ Memory used by all arrays """
+        nbytes = self.jet_offsets.nbytes + self.parton_offsets.nbytes + self.fsr_offsets.nbytes # noqa
+        for arrays in [self.jets, self.partons, self.fsrs]:
+            nbytes += sum(values.nbytes for values in arrays.values())
+        return nbytes
+
+    def event(self, index: int) -> dict:
+        """ Get plain event (see events.py) """
+        def collection(arrays, offsets, fields):
+            first, last = offsets[index], offsets[index + 1]
+            values = {field: arrays[field][first:last].tolist() for field in fields} # noqa
+            return [
+                {field: values[field][i] for field in fields}
+                for i in range(last - first)
+                ]
+        return {
+            'jets': collection(self.jets, self.jet_offsets, JET_FIELDS),
+            'partons': collection(self.partons, self.parton_offsets, PARTON_FIELDS), # noqa
+            'fsrs': collection(self.fsrs, self.fsr_offsets, FSR_FIELDS),
+            }
+
+
+class RPVBatchResult():
+    """ Decorations of every jet of a batch (aligned with the input jets) """
+    __fields = ('match_type', 'parton_index', 'pdgid', 'barcode', 'gluino_barcode', 'neutralino_barcode', 'neutralino') # noqa
+
+    def __init__(self, jet_offsets: np.ndarray, dtype_policy: str = 'Default'):
+        n_jets = jet_offsets[-1]
+        self.jet_offsets = jet_offsets
+        self.dtype_policy = dtype_policy
+        self.match_type = np.full(n_jets, MATCH_NONE, dtype=get_dtype('match_type', dtype_policy)) # noqa
+        self.parton_index = np.full(n_jets, -1, dtype=get_dtype('index', dtype_policy)) # noqa
+        self.pdgid = np.full(n_jets, -1, dtype=get_dtype('pdgid', dtype_policy)) # noqa
+        self.barcode = np.full(n_jets, -1, dtype=get_dtype('barcode', dtype_policy)) # noqa
+        self.gluino_barcode = np.full(n_jets, -1, dtype=get_dtype('barcode', dtype_policy)) # noqa
+        self.neutralino_barcode = np.full(n_jets, -1, dtype=get_dtype('barcode', dtype_policy)) # noqa
+        self.neutralino = np.zeros(n_jets, dtype=bool)
+
+    def get_nbytes(self) -> int:
+        """ Memory used by all arrays """
+        return sum(getattr(self, field).nbytes for field in self.__fields)
+
+    def differs(self, other) -> np.ndarray:
+        """ Check which jets have different decorations in another result """
+        different = np.zeros(len(self.match_type), dtype=bool)
+        for field in self.__fields:
+            different |= getattr(self, field).astype(np.int64) != getattr(other, field).astype(np.int64) # noqa
+        return different
+
+    def is_matched(self) -> np.ndarray:
+        return self.match_type != MATCH_NONE
+
+    def get_events(self, first: int, last: int):
+        """ Get result of events [first, last) sharing the arrays of this result """ # noqa
+        first_jet, last_jet = self.jet_offsets[first], self.jet_offsets[last]
+        result = copy.copy(self)
+        result.jet_offsets = self.jet_offsets[first:last + 1] - first_jet
+        for field in self.__fields:
+            setattr(result, field, getattr(self, field)[first_jet:last_jet])
+        return result
+
+    def set_matches(self, jets: np.ndarray, match_type: int, parton_index: np.ndarray, barcode: np.ndarray, partons: dict, parton: np.ndarray): # noqa
+        """ Decorate jets matched to partons/FSRs (parton: position in the parton/FSR arrays) """ # noqa
+        self.match_type[jets] = match_type
+        self.parton_index[jets] = parton_index
+        self.pdgid[jets] = partons['pdgid'][parton]
+        self.barcode[jets] = barcode
+        self.gluino_barcode[jets] = partons['gluino_barcode'][parton]
+        self.neutralino_barcode[jets] = partons['neutralino_barcode'][parton]
+        self.neutralino[jets] = partons['neutralino_barcode'][parton] != -999
+
+    def unset_matches(self, jets: np.ndarray):
+        """ Remove decorations of jets """
+        self.match_type[jets] = MATCH_NONE
+        for field in self.__fields[1:-1]:
+            getattr(self, field)[jets] = -1
+        self.neutralino[jets] = False
+
+    def set_event(self, index: int, infos: List[Tuple]):
+        """ Set decorations of jets of an event (ordered as MATCH_FIELDS) """
+        first = self.jet_offsets[index]
+        for jet_index, info in enumerate(infos):
+            match_type, parton_index, pdgid, barcode, gluino_barcode, neutralino_barcode, neutralino = info # noqa
+            self.match_type[first + jet_index] = MATCH_TYPES.index(match_type)
+            self.parton_index[first + jet_index] = parton_index
+            self.pdgid[first + jet_index] = pdgid
+            self.barcode[first + jet_index] = barcode
+            self.gluino_barcode[first + jet_index] = gluino_barcode
+            self.neutralino_barcode[first + jet_index] = neutralino_barcode
+            self.neutralino[first + jet_index] = neutralino
+
+    def event(self, index: int) -> List[Tuple]:
+        """ Get decorations of jets of an event (ordered as MATCH_FIELDS) """
+        first, last = self.jet_offsets[index], self.jet_offsets[index + 1]
+        infos = []
+        for jet_index in range(first, last):
+            match_type = int(self.match_type[jet_index])
+            if match_type == MATCH_NONE:
+                infos.append(NOT_MATCHED)
+                continue
+            infos.append((
+                MATCH_TYPES[match_type],
+                int(self.parton_index[jet_index]),
+                int(self.pdgid[jet_index]),
+                int(self.barcode[jet_index]),
+                int(self.gluino_barcode[jet_index]),
+                int(self.neutralino_barcode[jet_index]),
+                bool(self.neutralino[jet_index]),
+                ))
+        return infos
+
+
+class RPVBatchMatcher():
+    """
+    Match jets to partons (and optionally FSRs) for a whole RPVEventBatch
+
+    Decisions are the same as the ones from RPVMatcher for every event.
+    'UseFTDeltaRvalues' is implemented as sorted-key joins over
+    (event, barcode) across the whole batch; the other matching criteria
+    loop over jet positions, matching the n-th jet of all events at once.
+    With NumThreads > 1 the batch is split into event ranges matched in
+    threads sharing the input arrays, each writing to its own slice of the
+    result (threads only run in parallel inside numpy operations, see
+    thread_benchmark.py).
+    Results are always provided for every jet (see RPVBatchResult.is_matched()).
+    """
+    __properties_defaults = {
+        **MATCHING_PROPERTIES_DEFAULTS,
+        'DtypePolicy': 'Default',  # dtype policy of the results (see DTYPE_POLICIES) # noqa
+        'NumThreads': 1,  # number of threads matching different events in parallel # noqa
+        }
+    __matching_criteria = [
+        'UseFTDeltaRvalues',
+        'RecomputeDeltaRvalues_drPriority',
+        'RecomputeDeltaRvalues_ptPriority',
+        ]
+
+    def __init__(self, **kargs):
+        self.__log = logging.getLogger()
+        self.__properties = dict(self.__properties_defaults)
+        self.__accumulators = []
+        for key, value in kargs.items():
+            self.set_property(key, value)
+
+    def set_property(self, opt: str, value: Union[bool, float, str]):
+        if opt not in self.__properties_defaults:
+            self.__log.fatal(f'{opt} was not recognized, exiting')
+            sys.exit(1)
+        self.__properties[opt] = value
+        for accumulator in self.__accumulators:
+            accumulator.set_config(self.__properties)
+
+    def get_properties(self) -> dict:
+        return dict(self.__properties)
+
+    def add_accumulator(self, accumulator):
+        """ Fill accumulator after every match() call (see accumulators.py) """
+        accumulator.set_config(self.__properties)
+        self.__accumulators.append(accumulator)
+
+    def __fatal(self, msg: str):
+        self.__log.fatal(msg + ', exiting')
+        sys.exit(1)
+
+    def __check_inputs(self, batch: RPVEventBatch):
+        """ Same protections as RPVMatcher.match() for every event """
+        prop = self.__properties
+        matching_criteria = prop['MatchingCriteria']
+        if matching_criteria not in self.__matching_criteria:
+            self.__fatal(f'MatchingCriteria=={matching_criteria} is not supported') # noqa
+        non_default_cut = prop['DeltaRcut'] != self.__properties_defaults['DeltaRcut'] # noqa
+        if non_default_cut and 'RecomputeDeltaRvalues' not in matching_criteria: # noqa
+            self.__fatal('DeltaRcut set but "RecomputeDeltaRvalues" not in MatchingCriteria') # noqa
+        if (np.diff(batch.jet_offsets) == 0).any():
+            self.__fatal(f'No jets were provided for event {np.argmax(np.diff(batch.jet_offsets) == 0)}') # noqa
+        if (np.diff(batch.parton_offsets) == 0).any():
+            self.__fatal(f'No partons were provided for event {np.argmax(np.diff(batch.parton_offsets) == 0)}') # noqa
+        for name, arrays, fields in [('parton', batch.partons, PARTON_FIELDS), ('FSR', batch.fsrs, FSR_FIELDS)]: # noqa
+            for field in ['quark_barcode', 'gluino_barcode', 'barcode', 'pdgid']: # noqa
+                if field in fields and (arrays[field] == -999).any():
+                    index = np.argmax(arrays[field] == -999)
+                    self.__fatal(f'{field} not set for {name}_index = {index}')
+
+    def match(self, batch: RPVEventBatch) -> RPVBatchResult:
+        result = RPVBatchResult(batch.jet_offsets, self.__properties['DtypePolicy']) # noqa
+        if not batch.get_n_events():
+            return result
+        self.__check_inputs(batch)
+        n_threads = self.__properties['NumThreads']
+        if n_threads < 1:
+            self.__fatal(f'NumThreads={n_threads} must be positive')
+        if n_threads == 1:
+            self.__match_events(batch, result)
+        else:
+            # Event ranges with similar number of jets
+            bounds = np.unique(np.searchsorted(
+                batch.jet_offsets,
+                np.linspace(0, batch.jet_offsets[-1], n_threads + 1)[1:-1]
+                ))
+            bounds = [0] + [bound for bound in bounds.tolist() if 0 < bound < batch.get_n_events()] + [batch.get_n_events()] # noqa
+            with ThreadPoolExecutor(max_workers=n_threads) as pool:
+                futures = [
+                    pool.submit(self.__match_events, batch.get_events(first, last), result.get_events(first, last)) # noqa
+                    for first, last in zip(bounds[:-1], bounds[1:])
+                    ]
+                for future in futures:
+                    future.result()  # raises exceptions (e.g. SystemExit) from the threads # noqa
+        for accumulator in self.__accumulators:
+            accumulator.fill_batch(batch, result)
+        return result
+
+    def __match_events(self, batch: RPVEventBatch, result: RPVBatchResult):
+        if self.__properties['MatchingCriteria'] == 'UseFTDeltaRvalues':
+            self.__match_use_deltar_values_from_ft(batch, result)
+        else:
+            ambiguous = self.__match_recompute_deltar_values(batch, result)
+            for index in np.flatnonzero(ambiguous):
+                self.__match_event(batch, result, index)
+        if not self.__properties['DisableNmatchedJetProtection']:
+            self.__check_n_matched_jets(batch, result)
+
+    def __match_event(self, batch: RPVEventBatch, result: RPVBatchResult, index: int): # noqa
+        """ Match an event with RPVMatcher """
+        from rpv_matcher.events import match_event
+        properties = dict(self.__properties)
+        properties.pop('DtypePolicy')
+        properties.pop('NumThreads')
+        infos = match_event(batch.event(index), properties)
+        if infos == EXIT:
+            sys.exit(1)
+        result.set_event(index, infos)
+
+    def __check_n_matched_jets(self, batch: RPVEventBatch, result: RPVBatchResult): # noqa
+        """ Exit if more than maxNmatchedJets jets were matched in any event """
+        n_matched = np.add.reduceat(result.is_matched().astype(np.int64), batch.jet_offsets[:-1]) # noqa
+        max_n_matched = self.__properties['maxNmatchedJets']
+        if (n_matched > max_n_matched).any():
+            self.__fatal(f'more than {max_n_matched} ({n_matched.max()}) jets are matched') # noqa
+
+    def __match_use_deltar_values_from_ft(self, batch: RPVEventBatch, result: RPVBatchResult): # noqa
+        """ Match jets to partons and FSRs resolving FT barcodes with sorted-key joins """ # noqa
+        jets, partons, fsrs = batch.jets, batch.partons, batch.fsrs
+        jet_event = get_event_index(batch.jet_offsets)
+
+        # Jets -> partons
+        parton_barcode = jets['matched_parton_barcode']
+        has_parton = parton_barcode != -1
+        found, parton = lookup(*join_keys(get_event_index(batch.parton_offsets), partons['barcode'], jet_event, parton_barcode)) # noqa
+        if (has_parton & ~found).any():
+            missing = np.argmax(has_parton & ~found)
+            self.__log.error(f'Parton with barcode={parton_barcode[missing]} not found, exiting') # noqa
+            sys.exit(1)
+        matched = np.flatnonzero(has_parton)
+        parton = parton[matched]
+        result.set_matches(matched, MATCH_PARTON, parton - batch.parton_offsets[jet_event[matched]], parton_barcode[matched], partons, parton) # noqa
+
+        # Jets -> FSRs (only in events with FSRs and less than maxNmatchedJets matched jets) # noqa
+        n_matched = np.add.reduceat(has_parton.astype(np.int64), batch.jet_offsets[:-1]) # noqa
+        use_fsrs = (np.diff(batch.fsr_offsets) > 0) & (n_matched < self.__properties['maxNmatchedJets']) # noqa
+        fsr_barcode = jets['matched_fsr_barcode']
+        candidates = np.flatnonzero(~has_parton & (fsr_barcode != -1) & use_fsrs[jet_event]) # noqa
+        found, fsr = lookup(*join_keys(get_event_index(batch.fsr_offsets), fsrs['barcode'], jet_event[candidates], fsr_barcode[candidates])) # noqa
+        if (~found).any():
+            missing = candidates[np.argmax(~found)]
+            self.__log.error(f'FSR with barcode={fsr_barcode[missing]} not found, exiting') # noqa
+            sys.exit(1)
+        # Skip FSRs from quarks already matched to a jet
+        matched_keys, quark_keys = join_keys(jet_event[matched], parton_barcode[matched], jet_event[candidates], fsrs['quark_barcode'][fsr]) # noqa
+        quark_matched, _ = lookup(matched_keys, quark_keys)
+        candidates, fsr, quark_keys = candidates[~quark_matched], fsr[~quark_matched], quark_keys[~quark_matched] # noqa
+        # If several jets are matched to FSRs from the same quark, the jet with
+        # highest pt is kept (the last one in case of equal pt)
+        pt = tlv_pt(jets['pt'][candidates], jets['phi'][candidates])
+        order = np.lexsort((candidates, pt, quark_keys))
+        is_last = np.ones(len(order), dtype=bool)
+        is_last[:-1] = quark_keys[order][1:] != quark_keys[order][:-1]
+        winners = order[is_last]
+        matched, fsr = candidates[winners], fsr[winners]
+        result.set_matches(matched, MATCH_FSR, fsr - batch.fsr_offsets[jet_event[matched]], fsrs['quark_barcode'][fsr], fsrs, fsr) # noqa
+
+    def __match_recompute_deltar_values(self, batch: RPVEventBatch, result: RPVBatchResult) -> np.ndarray: # noqa
+        """
+        Match jets to partons and FSRs recomputing DeltaR values
+
+        Jets are processed in order (as in RPVMatcher), but the n-th jet of
+        all events is matched at once against (n_events, max_n_partons)
+        padded parton/FSR arrays.
+        Returns which events have decisions depending on DeltaR differences
+        smaller than their tolerance (see get_deltar_tolerance() and
+        __match_event())
+        """
+        prop = self.__properties
+        dr_cut = min(prop['DeltaRcut'], 1E5)  # RPVMatcher starts from DeltaR_min = 1E5 # noqa
+        dr_priority = prop['MatchingCriteria'] == 'RecomputeDeltaRvalues_drPriority' # noqa
+        jets, partons, fsrs = batch.jets, batch.partons, batch.fsrs
+        n_jets = np.diff(batch.jet_offsets)
+        jet_eta, jet_phi = tlv_eta_phi(jets['pt'], jets['eta'], jets['phi'])
+        jet_pt = tlv_pt(jets['pt'], jets['phi'])
+        jet_tolerance = get_eta_tolerance(jets['eta'])
+        matched = np.zeros(len(jet_eta), dtype=bool)
+        ambiguous = np.zeros(batch.get_n_events(), dtype=bool)
+
+        # Jets -> partons
+        eta, phi = tlv_eta_phi(partons['pt'], partons['eta'], partons['phi'])
+        parton_eta = to_dense(eta, batch.parton_offsets, 0.0)
+        parton_phi = to_dense(phi, batch.parton_offsets, 0.0)
+        parton_barcode = to_dense(partons['barcode'].astype(np.int64), batch.parton_offsets, -1) # noqa
+        parton_valid = to_dense(np.ones(len(eta), dtype=bool), batch.parton_offsets, False) # noqa
+        parton_tolerance = to_dense(get_eta_tolerance(partons['eta']), batch.parton_offsets, 0.0) # noqa
+        fsr_quark_barcode = to_dense(fsrs['quark_barcode'].astype(np.int64), batch.fsr_offsets, -1) # noqa
+        # partons/FSRs whose (quark) barcode was matched to a jet
+        parton_blocked = np.zeros(parton_valid.shape, dtype=bool)
+        fsr_blocked = np.zeros(fsr_quark_barcode.shape, dtype=bool)
+        for position in range(int(n_jets.max())):
+            events = np.flatnonzero(n_jets > position)
+            jet = batch.jet_offsets[events] + position
+            candidates = parton_valid[events]
+            if not prop['MatchJetsToMatchedQuarks']:
+                candidates &= ~parton_blocked[events]
+            index, dr_min, dr_next = get_closest(jet_eta[jet], jet_phi[jet], parton_eta[events], parton_phi[events], candidates) # noqa
+            tolerance = get_deltar_tolerance(jet_tolerance[jet], parton_tolerance[events], candidates) # noqa
+            ambiguous[events] |= is_ambiguous(dr_min, dr_next, dr_cut, tolerance) # noqa
+            is_matched = dr_min < dr_cut
+            events, jet, index = events[is_matched], jet[is_matched], index[is_matched] # noqa
+            barcode = parton_barcode[events, index]
+            parton_blocked[events] |= parton_barcode[events] == barcode[:, None] # noqa
+            fsr_blocked[events] |= fsr_quark_barcode[events] == barcode[:, None] # noqa
+            matched[jet] = True
+            result.set_matches(jet, MATCH_PARTON, index, barcode, partons, batch.parton_offsets[events] + index) # noqa
+
+        # Jets -> FSRs (only in events with FSRs and less than maxNmatchedJets matched jets) # noqa
+        n_matched = np.bincount(get_event_index(batch.jet_offsets)[matched], minlength=batch.get_n_events()) # noqa
+        use_fsrs = (np.diff(batch.fsr_offsets) > 0) & (n_matched < prop['maxNmatchedJets']) # noqa
+        if not use_fsrs.any():
+            return ambiguous
+        eta, phi = tlv_eta_phi(fsrs['pt'], fsrs['eta'], fsrs['phi'])
+        fsr_eta = to_dense(eta, batch.fsr_offsets, 0.0)
+        fsr_phi = to_dense(phi, batch.fsr_offsets, 0.0)
+        fsr_valid = to_dense(np.ones(len(eta), dtype=bool), batch.fsr_offsets, False) # noqa
+        fsr_tolerance = to_dense(get_eta_tolerance(fsrs['eta']), batch.fsr_offsets, 0.0) # noqa
+        if not prop['MatchJetsToMatchedQuarks'] and not prop['MatchFSRsFromMatchedGluinoDecays']: # noqa
+            fsr_valid &= ~fsr_blocked
+        # jet matched to every FSR (-1 if none)
+        fsr_jet = np.full(fsr_valid.shape, -1, dtype=np.int64)
+        for position in range(int(n_jets.max())):
+            events = np.flatnonzero(use_fsrs & (n_jets > position))
+            jet = batch.jet_offsets[events] + position
+            events, jet = events[~matched[jet]], jet[~matched[jet]]
+            index, dr_min, dr_next = get_closest(jet_eta[jet], jet_phi[jet], fsr_eta[events], fsr_phi[events], fsr_valid[events]) # noqa
+            tolerance = get_deltar_tolerance(jet_tolerance[jet], fsr_tolerance[events], fsr_valid[events]) # noqa
+            ambiguous[events] |= is_ambiguous(dr_min, dr_next, dr_cut, tolerance) # noqa
+            is_matched = dr_min < dr_cut
+            events, jet, index, dr_min, tolerance = events[is_matched], jet[is_matched], index[is_matched], dr_min[is_matched], tolerance[is_matched] # noqa
+            quark_barcode = fsr_quark_barcode[events, index]
+            # If another jet is matched to an FSR from the same quark, keep
+            # the one with highest pt (or lowest DeltaR, depending on config)
+            same_quark = (fsr_jet[events] != -1) & (fsr_quark_barcode[events] == quark_barcode[:, None]) # noqa
+            has_other = same_quark.any(axis=1)
+            other_index = np.argmax(same_quark, axis=1)
+            other_jet = fsr_jet[events, other_index]
+            if dr_priority:
+                other_dr = delta_r(jet_eta[other_jet], jet_phi[other_jet], fsr_eta[events, other_index], fsr_phi[events, other_index]) # noqa
+                loses = has_other & (other_dr < dr_min)
+                ambiguous[events] |= has_other & (np.abs(other_dr - dr_min) < tolerance + 2 * jet_tolerance[other_jet]) # noqa
+            else:
+                loses = has_other & (jet_pt[jet] < jet_pt[other_jet])
+            replaced = has_other & ~loses
+            result.unset_matches(other_jet[replaced])
+            matched[other_jet[replaced]] = False
+            fsr_jet[events[replaced], other_index[replaced]] = -1
+            events, jet, index, quark_barcode = events[~loses], jet[~loses], index[~loses], quark_barcode[~loses] # noqa
+            fsr_jet[events, index] = jet
+            matched[jet] = True
+            result.set_matches(jet, MATCH_FSR, index, quark_barcode, fsrs, batch.fsr_offsets[events] + index) # noqa
+        return ambiguous
+
+
+def measure_precision_effects(batch: RPVEventBatch, properties: dict = None, dtype_policy: str = 'Compact') -> dict: # noqa
+    """
+    Measure how often storing a (float64) batch with another dtype policy
+    changes matching decisions
+
+    Returns the number of jets and events with different decorations,
+    the number of jet-parton/FSR pairs, how many have a float64 DeltaR value
+    closer than COMPACT_DELTAR_TOLERANCE to DeltaRcut, and for how many
+    of them the DeltaR < DeltaRcut decision flips (always 0 with
+    'UseFTDeltaRvalues', which does not use DeltaRcut)
+    """
+    properties = dict(properties) if properties else dict()
+    properties.pop('DtypePolicy', None)
+    reduced = batch.astype(dtype_policy)
+    matcher = RPVBatchMatcher(**properties)
+    result = matcher.match(batch)
+    reduced_result = matcher.match(reduced)
+    changed_jets = result.differs(reduced_result)
+    changed_events = np.add.reduceat(changed_jets.astype(np.int64), batch.jet_offsets[:-1]) > 0 if len(changed_jets) else changed_jets # noqa
+    properties = matcher.get_properties()
+    use_cut = properties['MatchingCriteria'] != 'UseFTDeltaRvalues'
+    counts = {
+        'jets': int(len(changed_jets)),
+        'changed_jets': int(changed_jets.sum()),
+        'events': batch.get_n_events(),
+        'changed_events': int(changed_events.sum()),
+        'pairs': 0,
+        'pairs_near_cut': 0,
+        'cut_flips': 0,
+        }
+    for name, offsets in [('partons', batch.parton_offsets), ('fsrs', batch.fsr_offsets)]: # noqa
+        jet_index, parton_index = get_pairs(batch.jet_offsets, offsets)
+        drs = []
+        for sample in [batch, reduced]:
+            jets, partons = sample.jets, getattr(sample, name)
+            jet_eta, jet_phi = tlv_eta_phi(jets['pt'][jet_index], jets['eta'][jet_index], jets['phi'][jet_index]) # noqa
+            parton_eta, parton_phi = tlv_eta_phi(partons['pt'][parton_index], partons['eta'][parton_index], partons['phi'][parton_index]) # noqa
+            drs.append(delta_r(jet_eta, jet_phi, parton_eta, parton_phi))
+        counts['pairs'] += len(jet_index)
+        if use_cut:
+            dr_cut = properties['DeltaRcut']
+            counts['pairs_near_cut'] += int((np.abs(drs[0] - dr_cut) < COMPACT_DELTAR_TOLERANCE).sum()) # noqa
+            counts['cut_flips'] += int(((drs[0] < dr_cut) != (drs[1] < dr_cut)).sum()) # noqa
+    return counts
+
+
+def batched_backend(cases: List[Tuple], **extra_properties) -> list:
+    """ Fuzzer backend (see fuzzer.py): one batch per configuration """
+    outcomes = [None] * len(cases)
+    groups = {}
+    for index, (properties, _) in enumerate(cases):
+        groups.setdefault(json.dumps(properties, sort_keys=True), []).append(index) # noqa
+    for key, indexes in groups.items():
+        properties = dict(json.loads(key))
+        properties.pop('ReturnOnlyMatched', None)
+        properties.pop('Debug', None)
+        matcher = RPVBatchMatcher(**properties, **extra_properties)
+        try:
+            batch = RPVEventBatch.from_events([cases[index][1] for index in indexes]) # noqa
+            result = matcher.match(batch)
+            for position, index in enumerate(indexes):
+                outcomes[index] = result.event(position)
+        except SystemExit:
+            # Find out which events exit
+            for index in indexes:
+                try:
+                    batch = RPVEventBatch.from_events([cases[index][1]])
+                    outcomes[index] = matcher.match(batch).event(0)
+                except SystemExit:
+                    outcomes[index] = EXIT
+    return outcomes
+
+
+def threaded_backend(cases: List[Tuple]) -> list:
+    """ Fuzzer backend (see fuzzer.py): batches matched in 4 threads """
+    return batched_backend(cases, NumThreads=4)
@@ -0,0 +1,117 @@
+#########################################################################
+# Purpose: Plain (JSON-friendly) representation of matcher inputs and   #
+#          outputs, and conversion from/to RPVJet/RPVParton objects     #
+# Date:   19 October 2026                                               #
+#########################################################################
+
+from typing import Tuple
+
+from rpv_matcher.rpv_matcher import RPVJet
+from rpv_matcher.rpv_matcher import RPVParton
+from rpv_matcher.rpv_matcher import RPVMatcher
+
+# An event is a dict with 'jets', 'partons' and 'fsrs' keys,
+# each holding a list of dicts with the following fields
+JET_FIELDS = ('pt', 'eta', 'phi', 'e', 'matched_parton_barcode', 'matched_fsr_barcode') # noqa
+PARTON_FIELDS = ('pt', 'eta', 'phi', 'e', 'barcode', 'pdgid', 'gluino_barcode', 'neutralino_barcode') # noqa
+FSR_FIELDS = PARTON_FIELDS + ('quark_barcode',)
+
+# Values used for (optional) fields not provided
+INPUT_DEFAULTS = {
+    'matched_parton_barcode': -1,
+    'matched_fsr_barcode': -1,
+    'neutralino_barcode': -999,
+    }
+
+# Decorations of a matched jet (in this order)
+MATCH_FIELDS = ('match_type', 'parton_index', 'pdgid', 'barcode', 'gluino_barcode', 'neutralino_barcode', 'neutralino') # noqa
+NOT_MATCHED = ('None', -1, -1, -1, -1, -1, False)
+
+# Possible match types (backends storing them as integer codes use the index)
+MATCH_TYPES = ('None', 'Parton', 'FSR')
+
+# Outcome of an event for which the matcher exits (e.g. unknown barcode)
+EXIT = 'exit'
+
+
+def make_jet(info: dict) -> RPVJet:
+    jet = RPVJet(info['pt'], info['eta'], info['phi'], info['e'])
+    jet.set_matched_parton_barcode(info['matched_parton_barcode'])
+    jet.set_matched_fsr_barcode(info['matched_fsr_barcode'])
+    return jet
+
+
+def make_parton(info: dict) -> RPVParton:
+    parton = RPVParton(info['pt'], info['eta'], info['phi'], info['e'])
+    parton.set_barcode(info['barcode'])
+    parton.set_pdgid(info['pdgid'])
+    parton.set_gluino_barcode(info['gluino_barcode'])
+    parton.set_neutralino_barcode(info['neutralino_barcode'])
+    if 'quark_barcode' in info:
+        parton.set_quark_barcode(info['quark_barcode'])
+    return parton
+
+
+def event_to_objects(event: dict) -> Tuple:  # -> ("jets", "partons", "fsrs")
+    """ Construct RPVJet/RPVParton objects from a plain event """
+    jets = [make_jet(info) for info in event['jets']]
+    partons = [make_parton(info) for info in event['partons']]
+    fsrs = [make_parton(info) for info in event['fsrs']]
+    return jets, partons, fsrs
+
+
+def event_from_objects(jets: [RPVJet], partons: [RPVParton], fsrs: [RPVParton]) -> dict: # noqa
+    """ Get plain event from (not yet matched) RPVJet/RPVParton objects """
+    def parton_info(parton, is_fsr):
+        info = {
+            'pt': parton.Pt(),
+            'eta': parton.Eta(),
+            'phi': parton.Phi(),
+            'e': parton.E(),
+            'barcode': parton.get_barcode(),
+            'pdgid': parton.get_pdgid(),
+            'gluino_barcode': parton.get_gluino_barcode(),
+            'neutralino_barcode': parton.get_neutralino_barcode(),
+            }
+        if is_fsr:
+            info['quark_barcode'] = parton.get_quark_barcode()
+        return info
+    return {
+        'jets': [{
+            'pt': jet.Pt(),
+            'eta': jet.Eta(),
+            'phi': jet.Phi(),
+            'e': jet.E(),
+            'matched_parton_barcode': jet.get_matched_parton_barcode(),
+            'matched_fsr_barcode': jet.get_matched_fsr_barcode(),
+            } for jet in jets],
+        'partons': [parton_info(parton, False) for parton in partons],
+        'fsrs': [parton_info(fsr, True) for fsr in fsrs] if fsrs else [],
+        }
+
+
+def get_match_info(jet: RPVJet) -> Tuple:
+    """ Get decorations of a jet (ordered as MATCH_FIELDS) """
+    if not jet.is_matched():
+        return NOT_MATCHED
+    return (
+        jet.get_match_type(),
+        jet.get_match_parton_index(),
+        jet.get_match_pdgid(),
+        jet.get_match_barcode(),
+        jet.get_match_gluino_barcode(),
+        jet.get_match_neutralino_barcode(),
+        jet.is_matched_to_neutralino(),
+        )
+
+
+def match_event(event: dict, properties: dict):  # -> [MATCH_FIELDS] or EXIT
+    """ Match a plain event with RPVMatcher (returns decorations of every jet) """
+    jets, partons, fsrs = event_to_objects(event)
+    properties = dict(properties, ReturnOnlyMatched=False)
+    try:
+        matcher = RPVMatcher(Jets=jets, Partons=partons, FSRs=fsrs, **properties) # noqa
+        matched_jets = matcher.match()
+    except SystemExit:
+        return EXIT
+    return [get_match_info(jet) for jet in matched_jets]
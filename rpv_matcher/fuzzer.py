@@ -0,0 +1,287 @@
+#########################################################################
+# Purpose: Differential fuzzer comparing matcher backends to the        #
+#          reference RPVMatcher implementation on random events         #
+# Date:   19 October 2026                                               #
+#########################################################################
+
+import sys
+import json
+import math
+import random
+import logging
+import argparse
+import importlib
+import multiprocessing
+from typing import Callable, List, Tuple
+
+MATCHING_CRITERIA = [
+    'UseFTDeltaRvalues',
+    'RecomputeDeltaRvalues_drPriority',
+    'RecomputeDeltaRvalues_ptPriority',
+    ]
+
+# Backends: name -> 'module:function'
+# A backend takes a list of (properties, event) cases and returns one outcome
+# per case (a list with the decorations of every jet or rpv_matcher.events.EXIT)
+# Exceptions raised by a backend are reported as mismatches (see CRASH)
+BACKENDS = {
+    'reference': 'rpv_matcher.fuzzer:reference_backend',
+    'batched': 'rpv_matcher.batched:batched_backend',
+    'threaded': 'rpv_matcher.batched:threaded_backend',
+    'rdataframe': 'rpv_matcher.rdataframe:rdataframe_backend',
+    }
+
+UNKNOWN_BARCODE = 999999
+
+# Jets are generated within the detector acceptance, truth partons and FSRs
+# (and jets close to them) also far forward, where recomputed eta values are
+# the least precise (see batched.get_eta_tolerance())
+JET_MAX_ETA = 2.5
+TRUTH_MAX_ETA = 8
+
+# Outcome (prefix) of cases for which a backend raised an exception
+CRASH = 'crash'
+
+
+def reference_backend(cases: List[Tuple]) -> list:
+    """ Match every case with RPVMatcher """
+    from rpv_matcher.events import match_event
+    return [match_event(event, properties) for properties, event in cases]
+
+
+def run_backend(backend: Callable, cases: List[Tuple]) -> list:
+    """ Get outcomes of a backend, recording exceptions raised for a case as its outcome """ # noqa
+    try:
+        return backend(cases)
+    except (Exception, SystemExit):
+        outcomes = []
+        for case in cases:
+            try:
+                outcomes.append(backend([case])[0])
+            except (Exception, SystemExit) as error:
+                outcomes.append(f'{CRASH}: {type(error).__name__}: {error}')
+        return outcomes
+
+
+def get_backend(name: str) -> Callable:
+    if name not in BACKENDS:
+        logging.getLogger().fatal(f'backend {name} was not recognized (options: {", ".join(BACKENDS)}), exiting') # noqa
+        sys.exit(1)
+    module_name, function_name = BACKENDS[name].split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def wrap_phi(phi: float) -> float:
+    while phi >= math.pi:
+        phi -= 2 * math.pi
+    while phi < -math.pi:
+        phi += 2 * math.pi
+    return phi
+
+
+def generate_properties(rng: random.Random) -> dict:
+    """ Random matcher configuration """
+    criteria = rng.choice(MATCHING_CRITERIA)
+    properties = {
+        'MatchingCriteria': criteria,
+        'DisableNmatchedJetProtection': rng.random() < 0.8,
+        'MatchJetsToMatchedQuarks': rng.random() < 0.3,
+        'MatchFSRsFromMatchedGluinoDecays': rng.random() < 0.3,
+        'maxNmatchedJets': rng.choice([6, 6, 6, 3]),
+        }
+    if criteria != 'UseFTDeltaRvalues':
+        properties['DeltaRcut'] = rng.choice([0.4, 0.4, 0.3, 0.5])
+    return properties
+
+
+def random_phi(rng: random.Random) -> float:
+    """ Uniform phi, with phi close to +-pi in 20% of the cases """
+    if rng.random() < 0.2:
+        return rng.choice([-1, 1]) * (math.pi - rng.uniform(0, 1e-3))
+    return rng.uniform(-math.pi, math.pi)
+
+
+def random_kinematics(rng: random.Random, max_eta: float) -> dict:
+    pt = rng.uniform(20, 300)
+    eta = rng.uniform(-max_eta, max_eta)
+    return {'pt': pt, 'eta': eta, 'phi': random_phi(rng), 'e': pt * math.cosh(eta)} # noqa
+
+
+def kinematics_near(rng: random.Random, target: dict, dr_cut: float) -> dict:
+    """ Kinematics close to target (identical, within, or right at DeltaR = dr_cut) """
+    mode = rng.random()
+    if mode < 0.1:
+        return {key: target[key] for key in ('pt', 'eta', 'phi', 'e')}
+    if mode < 0.3:  # right at the DeltaR cut
+        dr = dr_cut + rng.choice([-1, 1]) * rng.choice([1e-9, 1e-6, 1e-3])
+    else:
+        dr = rng.uniform(0, 1.5 * dr_cut)
+    angle = rng.uniform(0, 2 * math.pi)
+    pt = target['pt'] * rng.uniform(0.7, 1.3)
+    eta = target['eta'] + dr * math.cos(angle)
+    phi = wrap_phi(target['phi'] + dr * math.sin(angle))
+    return {'pt': pt, 'eta': eta, 'phi': phi, 'e': pt * math.cosh(eta)}
+
+
+def generate_event(rng: random.Random, properties: dict) -> dict:
+    """
+    Random event exercising edge cases: phi close to +-pi, exact DeltaR and
+    pt ties, FSRs sharing a quark barcode, duplicated and unknown barcodes,
+    forward partons/FSRs (with jets close to them)
+    """
+    from rpv_matcher.rpv_matcher import MATCHING_PROPERTIES_DEFAULTS
+    dr_cut = properties.get('DeltaRcut', MATCHING_PROPERTIES_DEFAULTS['DeltaRcut']) # noqa
+    # Partons (last quarks in the gluino decay chains)
+    partons = []
+    for index in range(rng.randint(1, 6)):
+        if partons and rng.random() < 0.1:  # DeltaR ties
+            parton = dict(rng.choice(partons))
+        else:
+            parton = random_kinematics(rng, TRUTH_MAX_ETA)
+        parton['barcode'] = index + 1 if rng.random() > 0.05 else rng.randint(1, index + 1) # noqa
+        parton['pdgid'] = rng.choice([1, 2, 3, 4, 5, -1, -2, -3, -4, -5])
+        parton['gluino_barcode'] = rng.choice([101, 102])
+        parton['neutralino_barcode'] = rng.choice([-999, -999, 201, 202])
+        partons.append(parton)
+    parton_barcodes = [parton['barcode'] for parton in partons]
+    # FSRs (mostly sharing the quark barcode of a few partons)
+    fsrs = []
+    for index in range(rng.choice([0, 0, 1, 2, 3, 4])):
+        if rng.random() < 0.5:
+            fsr = kinematics_near(rng, rng.choice(partons), dr_cut)
+        elif fsrs and rng.random() < 0.2:
+            fsr = dict(rng.choice(fsrs))
+        else:
+            fsr = random_kinematics(rng, TRUTH_MAX_ETA)
+        fsr['barcode'] = index + 1 if rng.random() > 0.05 else rng.randint(1, index + 1) # noqa
+        fsr['pdgid'] = rng.choice([1, 2, 3, 4, 5, 21])
+        fsr['gluino_barcode'] = rng.choice([101, 102])
+        fsr['neutralino_barcode'] = rng.choice([-999, -999, 201, 202])
+        fsr['quark_barcode'] = rng.choice(parton_barcodes[:2]) if rng.random() > 0.1 else 50 # noqa
+        fsrs.append(fsr)
+    # Jets
+    jets = []
+    for _ in range(rng.randint(1, 8)):
+        target = None
+        mode = rng.random()
+        if jets and mode < 0.1:  # pt and DeltaR ties
+            jet = {key: jets[-1][key] for key in ('pt', 'eta', 'phi', 'e')}
+        elif mode < 0.5:
+            target = ('Parton', rng.randrange(len(partons)))
+            jet = kinematics_near(rng, partons[target[1]], dr_cut)
+        elif fsrs and mode < 0.8:
+            target = ('FSR', rng.randrange(len(fsrs)))
+            jet = kinematics_near(rng, fsrs[target[1]], dr_cut)
+        else:
+            jet = random_kinematics(rng, JET_MAX_ETA)
+        jet['matched_parton_barcode'] = -1
+        jet['matched_fsr_barcode'] = -1
+        if target and rng.random() < 0.8:
+            key = 'matched_parton_barcode' if target[0] == 'Parton' else 'matched_fsr_barcode' # noqa
+            collection = partons if target[0] == 'Parton' else fsrs
+            jet[key] = collection[target[1]]['barcode']
+        if rng.random() < 0.02:
+            jet[rng.choice(['matched_parton_barcode', 'matched_fsr_barcode'])] = UNKNOWN_BARCODE # noqa
+        jets.append(jet)
+    if rng.random() < 0.8:  # selected jets are usually pt ordered
+        jets.sort(key=lambda jet: -jet['pt'])
+    return {'jets': jets, 'partons': partons, 'fsrs': fsrs}
+
+
+def generate_case(seed: int, index: int) -> Tuple:  # -> ("properties", "event")
+    """ Reproducible random case """
+    rng = random.Random(f'{seed}:{index}')
+    properties = generate_properties(rng)
+    return properties, generate_event(rng, properties)
+
+
+def minimize(case: Tuple, reference: Callable, candidate: Callable) -> Tuple:
+    """ Remove jets, FSRs and partons from a mismatching case while it keeps mismatching """ # noqa
+    properties, event = case
+
+    def mismatch(trial):
+        return run_backend(reference, [(properties, trial)]) != run_backend(candidate, [(properties, trial)]) # noqa
+
+    changed = True
+    while changed:
+        changed = False
+        for key in ('jets', 'fsrs', 'partons'):
+            index = 0
+            while index < len(event[key]):
+                trial = dict(event)
+                trial[key] = event[key][:index] + event[key][index + 1:]
+                if trial['jets'] and mismatch(trial):
+                    event = trial
+                    changed = True
+                else:
+                    index += 1
+    return properties, event
+
+
+def fuzz_chunk(args: Tuple) -> Tuple:  # -> ("n_cases", "reports")
+    """ Compare backend to reference for cases [first, last) """
+    backend_name, seed, first, last = args
+    logging.disable(logging.CRITICAL)  # matcher messages are expected (e.g. unknown barcodes) # noqa
+    reference = get_backend('reference')
+    candidate = get_backend(backend_name)
+    cases = [generate_case(seed, index) for index in range(first, last)]
+    reference_outcomes = run_backend(reference, cases)
+    candidate_outcomes = run_backend(candidate, cases)
+    reports = []
+    for offset, case in enumerate(cases):
+        if reference_outcomes[offset] == candidate_outcomes[offset]:
+            continue
+        properties, event = minimize(case, reference, candidate)
+        reports.append({
+            'seed': seed,
+            'index': first + offset,
+            'properties': properties,
+            'event': event,
+            'reference': run_backend(reference, [(properties, event)])[0],
+            'candidate': run_backend(candidate, [(properties, event)])[0],
+            })
+    return last - first, reports
+
+
+def fuzz(backend: str, n_events: int, seed: int = 0, workers: int = 1, chunk_size: int = 1000) -> List[dict]: # noqa
+    """ Fuzz backend against the reference with n_events random events """
+    get_backend(backend)  # protection
+    chunks = [
+        (backend, seed, first, min(first + chunk_size, n_events))
+        for first in range(0, n_events, chunk_size)
+        ]
+    reports = []
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            for _, chunk_reports in pool.imap_unordered(fuzz_chunk, chunks):
+                reports += chunk_reports
+    else:
+        for chunk in chunks:
+            reports += fuzz_chunk(chunk)[1]
+        logging.disable(logging.NOTSET)
+    return sorted(reports, key=lambda report: report['index'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare a matcher backend to the reference RPVMatcher on random events') # noqa
+    parser.add_argument('--backend', required=True, help=f'options: {", ".join(BACKENDS)}') # noqa
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count()) # noqa
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--output', default='mismatches.jsonl', help='minimal reproducing cases for every mismatch') # noqa
+    args = parser.parse_args()
+    logging.basicConfig(level='INFO', format='%(levelname)s: %(message)s')
+    log = logging.getLogger()
+    reports = fuzz(args.backend, args.events, args.seed, args.workers, args.chunk_size) # noqa
+    with open(args.output, 'w') as ofile:
+        for report in reports:
+            ofile.write(json.dumps(report) + '\n')
+    if reports:
+        log.error(f'{len(reports)} mismatches found in {args.events} events (minimal cases written to {args.output})') # noqa
+        sys.exit(1)
+    log.info(f'No mismatches found in {args.events} events')
+
+
+if __name__ == '__main__':
+    main()
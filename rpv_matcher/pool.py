@@ -0,0 +1,143 @@
+#########################################################################
+# Purpose: Reusable RPVJet/RPVParton objects refilled from arrays       #
+#          for every event                                              #
+# Date:   19 October 2026                                               #
+#########################################################################
+
+from typing import Sequence
+
+from rpv_matcher.rpv_matcher import RPVJet
+from rpv_matcher.rpv_matcher import RPVParton
+
+
+def to_list(values: Sequence) -> list:
+    """ Get values as a list of Python numbers (numpy arrays, RVecs, lists...) """ # noqa
+    if hasattr(values, 'tolist'):
+        return values.tolist()
+    return list(values)
+
+
+class RPVObjectPool():
+    """
+    Hand out reusable RPVJet/RPVParton objects
+
+    Objects are only constructed when an event has more jets/partons/FSRs
+    than any previous event, so memory stays flat over long runs.
+    Objects handed out for an event are reset (see RPVJet.reset() and
+    RPVParton.reset()) and must not be kept after requesting the next event.
+    Usage:
+        pool = RPVObjectPool()
+        for event in events:
+            jets = pool.fill_jets(pt, eta, phi, e, matched_parton_barcode, matched_fsr_barcode) # noqa
+            partons = pool.fill_partons(pt, eta, phi, e, barcode, pdgid, gluino_barcode) # noqa
+            fsrs = pool.fill_fsrs(pt, eta, phi, e, barcode, pdgid, gluino_barcode, quark_barcode) # noqa
+    """
+    def __init__(self):
+        self.__jets = []
+        self.__partons = []
+        self.__fsrs = []
+
+    @staticmethod
+    def __get(objects: list, object_type: type, n_objects: int) -> list:
+        while len(objects) < n_objects:
+            objects.append(object_type())
+        selected = objects[:n_objects]
+        for obj in selected:
+            obj.reset()
+        return selected
+
+    def get_jets(self, n_jets: int) -> [RPVJet]:
+        """ Get n_jets reset jets """
+        return self.__get(self.__jets, RPVJet, n_jets)
+
+    def get_partons(self, n_partons: int) -> [RPVParton]:
+        """ Get n_partons reset partons """
+        return self.__get(self.__partons, RPVParton, n_partons)
+
+    def get_fsrs(self, n_fsrs: int) -> [RPVParton]:
+        """ Get n_fsrs reset FSRs (not shared with the partons) """
+        return self.__get(self.__fsrs, RPVParton, n_fsrs)
+
+    def get_size(self) -> dict:
+        """ Number of constructed objects """
+        return {
+            'jets': len(self.__jets),
+            'partons': len(self.__partons),
+            'fsrs': len(self.__fsrs),
+            }
+
+    @staticmethod
+    def __set_kinematics(objects: list, pt, eta, phi, e):
+        for obj, kinematics in zip(objects, zip(to_list(pt), to_list(eta), to_list(phi), to_list(e))): # noqa
+            obj.SetPtEtaPhiE(*kinematics)
+
+    def fill_jets(
+            self,
+            pt: Sequence,
+            eta: Sequence,
+            phi: Sequence,
+            e: Sequence,
+            matched_parton_barcode: Sequence = None,
+            matched_fsr_barcode: Sequence = None,
+            qgtagger_bdt: Sequence = None,
+            ) -> [RPVJet]:
+        """ Get jets filled from arrays (one value per jet) """
+        jets = self.get_jets(len(pt))
+        self.__set_kinematics(jets, pt, eta, phi, e)
+        if matched_parton_barcode is not None:
+            for jet, barcode in zip(jets, to_list(matched_parton_barcode)):
+                jet.set_matched_parton_barcode(barcode)
+        if matched_fsr_barcode is not None:
+            for jet, barcode in zip(jets, to_list(matched_fsr_barcode)):
+                jet.set_matched_fsr_barcode(barcode)
+        if qgtagger_bdt is not None:
+            for jet, score in zip(jets, to_list(qgtagger_bdt)):
+                jet.set_qgtagger_bdt(score)
+        return jets
+
+    @staticmethod
+    def __set_truth(partons: list, barcode, pdgid, gluino_barcode, neutralino_barcode): # noqa
+        for parton, info in zip(partons, zip(to_list(barcode), to_list(pdgid), to_list(gluino_barcode))): # noqa
+            parton.set_barcode(info[0])
+            parton.set_pdgid(info[1])
+            parton.set_gluino_barcode(info[2])
+        if neutralino_barcode is not None:
+            for parton, value in zip(partons, to_list(neutralino_barcode)):
+                parton.set_neutralino_barcode(value)
+
+    def fill_partons(
+            self,
+            pt: Sequence,
+            eta: Sequence,
+            phi: Sequence,
+            e: Sequence,
+            barcode: Sequence,
+            pdgid: Sequence,
+            gluino_barcode: Sequence,
+            neutralino_barcode: Sequence = None,
+            ) -> [RPVParton]:
+        """ Get partons filled from arrays (one value per parton) """
+        partons = self.get_partons(len(pt))
+        self.__set_kinematics(partons, pt, eta, phi, e)
+        self.__set_truth(partons, barcode, pdgid, gluino_barcode, neutralino_barcode) # noqa
+        return partons
+
+    def fill_fsrs(
+            self,
+            pt: Sequence,
+            eta: Sequence,
+            phi: Sequence,
+            e: Sequence,
+            barcode: Sequence,
+            pdgid: Sequence,
+            gluino_barcode: Sequence,
+            quark_barcode: Sequence,
+            neutralino_barcode: Sequence = None,
+            ) -> [RPVParton]:
+        """ Get FSRs filled from arrays (one value per FSR) """
+        fsrs = self.get_fsrs(len(pt))
+        self.__set_kinematics(fsrs, pt, eta, phi, e)
+        self.__set_truth(fsrs, barcode, pdgid, gluino_barcode, neutralino_barcode) # noqa
+        for fsr, value in zip(fsrs, to_list(quark_barcode)):
+            fsr.set_quark_barcode(value)
+        return fsrs
@@ -0,0 +1,479 @@
+#########################################################################
+# Purpose: Match jets to partons inside ROOT's RDataFrame (runs on      #
+#          RDataFrame's thread pool when implicit MT is enabled)        #
+# Date:   19 October 2026                                               #
+#########################################################################
+
+import sys
+import logging
+from typing import List, Tuple, Union
+
+import ROOT
+
+from rpv_matcher.events import JET_FIELDS
+from rpv_matcher.events import FSR_FIELDS
+from rpv_matcher.events import PARTON_FIELDS
+from rpv_matcher.events import NOT_MATCHED
+from rpv_matcher.events import EXIT
+from rpv_matcher.events import MATCH_TYPES
+from rpv_matcher.events import INPUT_DEFAULTS
+from rpv_matcher.rpv_matcher import MATCHING_PROPERTIES_DEFAULTS
+
+# C++ version of RPVMatcher (same decisions, event by event), JIT-compiled
+# once per process. Errors which make RPVMatcher exit throw std::runtime_error
+CPP_CODE = r'''
+#include <algorithm>
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include "ROOT/RVec.hxx"
+#include "TLorentzVector.h"
+
+namespace RPVMatching {
+
+using ROOT::VecOps::RVec;
+
+enum Criteria { kUseFTDeltaRvalues = 0, kRecomputeDeltaRvalues_drPriority = 1, kRecomputeDeltaRvalues_ptPriority = 2 };
+enum MatchType { kNone = 0, kParton = 1, kFSR = 2 };
+
+struct Config {
+   int criteria;
+   double dr_cut;
+   bool disable_n_matched_jet_protection;
+   bool match_jets_to_matched_quarks;
+   bool match_fsrs_from_matched_gluino_decays;
+   int max_n_matched_jets;
+};
+
+struct Result {
+   RVec<int> match_type;
+   RVec<int> parton_index;
+   RVec<int> pdgid;
+   RVec<int> barcode;
+   RVec<int> gluino_barcode;
+   RVec<int> neutralino_barcode;
+   RVec<int> neutralino;
+};
+
+struct Particles {
+   const RVec<double> &pt, &eta, &phi, &e;
+   const RVec<int> &barcode, &pdgid, &gluino_barcode, &neutralino_barcode, &quark_barcode;
+};
+
+template <typename T>
+RVec<double> AsDouble(const RVec<T> &values) { return RVec<double>(values.begin(), values.end()); }
+
+template <typename T>
+RVec<int> AsInt(const RVec<T> &values) { return RVec<int>(values.begin(), values.end()); }
+
+class EventMatcher {
+public:
+   EventMatcher(const Config &config, const RVec<double> &jet_pt, const RVec<double> &jet_eta,
+                const RVec<double> &jet_phi, const RVec<double> &jet_e,
+                const RVec<int> &jet_matched_parton_barcode, const RVec<int> &jet_matched_fsr_barcode,
+                const Particles &partons, const Particles &fsrs)
+      : fConfig(config), fMatchedPartonBarcode(jet_matched_parton_barcode),
+        fMatchedFSRBarcode(jet_matched_fsr_barcode), fPartons(partons), fFSRs(fsrs)
+   {
+      const auto n_jets = jet_pt.size();
+      fResult.match_type = RVec<int>(n_jets, kNone);
+      fResult.parton_index = RVec<int>(n_jets, -1);
+      fResult.pdgid = RVec<int>(n_jets, -1);
+      fResult.barcode = RVec<int>(n_jets, -1);
+      fResult.gluino_barcode = RVec<int>(n_jets, -1);
+      fResult.neutralino_barcode = RVec<int>(n_jets, -1);
+      fResult.neutralino = RVec<int>(n_jets, 0);
+      fJets.resize(n_jets);
+      for (std::size_t i = 0; i < n_jets; ++i)
+         fJets[i].SetPtEtaPhiE(jet_pt[i], jet_eta[i], jet_phi[i], jet_e[i]);
+      fPartonVectors = Vectors(partons);
+      fFSRVectors = Vectors(fsrs);
+   }
+
+   Result Match()
+   {
+      if (fJets.empty())
+         throw std::runtime_error("No jets were provided");
+      if (fPartons.pt.empty())
+         throw std::runtime_error("No partons were provided");
+      CheckInfo(fPartons, false);
+      if (!fFSRs.pt.empty())
+         CheckInfo(fFSRs, true);
+      if (fConfig.criteria == kUseFTDeltaRvalues) {
+         MatchUsingFT(false);
+         if (!fFSRs.pt.empty() && NMatchedJets() < fConfig.max_n_matched_jets)
+            MatchUsingFT(true);
+      } else {
+         MatchRecomputingDeltaR(false);
+         if (!fFSRs.pt.empty() && NMatchedJets() < fConfig.max_n_matched_jets)
+            MatchRecomputingDeltaR(true);
+      }
+      const int n_matched = NMatchedJets();
+      if (!fConfig.disable_n_matched_jet_protection && n_matched > fConfig.max_n_matched_jets)
+         throw std::runtime_error("more than " + std::to_string(fConfig.max_n_matched_jets) + " (" +
+                                  std::to_string(n_matched) + ") jets are matched");
+      return fResult;
+   }
+
+private:
+   struct FSRMatch {
+      int fsr_index;
+      std::size_t jet_index;
+      int quark_barcode;
+   };
+
+   const Config &fConfig;
+   const RVec<int> &fMatchedPartonBarcode;
+   const RVec<int> &fMatchedFSRBarcode;
+   const Particles &fPartons;
+   const Particles &fFSRs;
+   std::vector<TLorentzVector> fJets;
+   std::vector<TLorentzVector> fPartonVectors;
+   std::vector<TLorentzVector> fFSRVectors;
+   std::vector<int> fMatchedPartons;  // barcodes of matched last quarks
+   std::vector<FSRMatch> fMatchedFSRs;
+   Result fResult;
+
+   static std::vector<TLorentzVector> Vectors(const Particles &particles)
+   {
+      std::vector<TLorentzVector> vectors(particles.pt.size());
+      for (std::size_t i = 0; i < vectors.size(); ++i)
+         vectors[i].SetPtEtaPhiE(particles.pt[i], particles.eta[i], particles.phi[i], particles.e[i]);
+      return vectors;
+   }
+
+   static void CheckInfo(const Particles &particles, bool is_fsr)
+   {
+      const std::string type = is_fsr ? "FSR" : "parton";
+      for (std::size_t i = 0; i < particles.pt.size(); ++i) {
+         const std::string index = type + "_index = " + std::to_string(i);
+         if (is_fsr && particles.quark_barcode[i] == -999)
+            throw std::runtime_error("quark_barcode not set for " + index);
+         if (particles.gluino_barcode[i] == -999)
+            throw std::runtime_error("gluino_barcode not set for " + index);
+         if (particles.barcode[i] == -999)
+            throw std::runtime_error("barcode not set for " + index);
+         if (particles.pdgid[i] == -999)
+            throw std::runtime_error("pdgid not set for " + index);
+      }
+   }
+
+   int NMatchedJets() const
+   {
+      return std::count_if(fResult.match_type.begin(), fResult.match_type.end(), [](int type) { return type != kNone; });
+   }
+
+   bool IsMatchedParton(int barcode) const
+   {
+      return std::find(fMatchedPartons.begin(), fMatchedPartons.end(), barcode) != fMatchedPartons.end();
+   }
+
+   void Decorate(std::size_t jet, int match_type, const Particles &particles, int index, int barcode)
+   {
+      fResult.match_type[jet] = match_type;
+      fResult.parton_index[jet] = index;
+      fResult.pdgid[jet] = particles.pdgid[index];
+      fResult.barcode[jet] = barcode;
+      fResult.gluino_barcode[jet] = particles.gluino_barcode[index];
+      fResult.neutralino_barcode[jet] = particles.neutralino_barcode[index];
+      fResult.neutralino[jet] = particles.neutralino_barcode[index] != -999;
+   }
+
+   void RemoveDecoration(std::size_t jet)
+   {
+      fResult.match_type[jet] = kNone;
+      fResult.parton_index[jet] = -1;
+      fResult.pdgid[jet] = -1;
+      fResult.barcode[jet] = -1;
+      fResult.gluino_barcode[jet] = -1;
+      fResult.neutralino_barcode[jet] = -1;
+      fResult.neutralino[jet] = 0;
+   }
+
+   void SetMatchedFSR(int fsr_index, std::size_t jet, int quark_barcode)
+   {
+      for (auto &match : fMatchedFSRs) {
+         if (match.fsr_index == fsr_index) {
+            match.jet_index = jet;
+            match.quark_barcode = quark_barcode;
+            return;
+         }
+      }
+      fMatchedFSRs.push_back({fsr_index, jet, quark_barcode});
+   }
+
+   // If 2 FSRs associated to the same last quark are matched, keep the jet
+   // with highest pt or lowest DeltaR depending on config
+   void CheckFSRMatchAndDecorateJet(std::size_t jet, int fsr_index, int quark_barcode, bool pt_priority)
+   {
+      bool another_fsr_matches_same_quark_barcode = false;
+      const auto current_matched_fsrs = fMatchedFSRs;
+      for (const auto &match : current_matched_fsrs) {
+         if (match.quark_barcode != quark_barcode)
+            continue;
+         another_fsr_matches_same_quark_barcode = true;
+         const auto &other_jet = fJets[match.jet_index];
+         if (pt_priority && fJets[jet].Pt() < other_jet.Pt())
+            continue;
+         if (!pt_priority && other_jet.DeltaR(fFSRVectors[match.fsr_index]) < fJets[jet].DeltaR(fFSRVectors[fsr_index]))
+            continue;
+         RemoveDecoration(match.jet_index);
+         fMatchedFSRs.erase(std::find_if(fMatchedFSRs.begin(), fMatchedFSRs.end(),
+                                         [&](const FSRMatch &other) { return other.fsr_index == match.fsr_index; }));
+         SetMatchedFSR(fsr_index, jet, quark_barcode);
+         Decorate(jet, kFSR, fFSRs, fsr_index, quark_barcode);
+      }
+      if (!another_fsr_matches_same_quark_barcode) {
+         SetMatchedFSR(fsr_index, jet, quark_barcode);
+         Decorate(jet, kFSR, fFSRs, fsr_index, quark_barcode);
+      }
+   }
+
+   static int FindBarcode(const Particles &particles, int barcode, const std::string &type)
+   {
+      for (std::size_t i = 0; i < particles.barcode.size(); ++i) {
+         if (particles.barcode[i] == barcode)
+            return i;
+      }
+      throw std::runtime_error(type + " with barcode=" + std::to_string(barcode) + " not found");
+   }
+
+   void MatchUsingFT(bool is_fsr)
+   {
+      for (std::size_t jet = 0; jet < fJets.size(); ++jet) {
+         if (fResult.match_type[jet] != kNone)
+            continue;
+         const int jet_matched_barcode = is_fsr ? fMatchedFSRBarcode[jet] : fMatchedPartonBarcode[jet];
+         if (jet_matched_barcode == -1)
+            continue;
+         if (is_fsr) {
+            const int fsr_index = FindBarcode(fFSRs, jet_matched_barcode, "FSR");
+            const int quark_barcode = fFSRs.quark_barcode[fsr_index];
+            if (!IsMatchedParton(quark_barcode))
+               CheckFSRMatchAndDecorateJet(jet, fsr_index, quark_barcode, fConfig.criteria != kRecomputeDeltaRvalues_drPriority);
+         } else {
+            const int parton_index = FindBarcode(fPartons, jet_matched_barcode, "Parton");
+            fMatchedPartons.push_back(jet_matched_barcode);
+            Decorate(jet, kParton, fPartons, parton_index, jet_matched_barcode);
+         }
+      }
+   }
+
+   void MatchRecomputingDeltaR(bool is_fsr)
+   {
+      const Particles &particles = is_fsr ? fFSRs : fPartons;
+      const auto &vectors = is_fsr ? fFSRVectors : fPartonVectors;
+      for (std::size_t jet = 0; jet < fJets.size(); ++jet) {
+         if (fResult.match_type[jet] != kNone)
+            continue;
+         double dr_min = 1E5;
+         int matched_index = -1;
+         int matched_barcode = -1;
+         for (std::size_t i = 0; i < vectors.size(); ++i) {
+            const int barcode = is_fsr ? particles.quark_barcode[i] : particles.barcode[i];
+            if (IsMatchedParton(barcode) && !fConfig.match_jets_to_matched_quarks) {
+               if (!is_fsr || !fConfig.match_fsrs_from_matched_gluino_decays)
+                  continue;
+            }
+            const double dr = fJets[jet].DeltaR(vectors[i]);
+            if (dr < dr_min) {
+               dr_min = dr;
+               matched_index = i;
+               matched_barcode = barcode;
+            }
+         }
+         if (dr_min >= fConfig.dr_cut)
+            continue;
+         if (is_fsr) {
+            CheckFSRMatchAndDecorateJet(jet, matched_index, matched_barcode, fConfig.criteria != kRecomputeDeltaRvalues_drPriority);
+         } else {
+            fMatchedPartons.push_back(matched_barcode);
+            Decorate(jet, kParton, fPartons, matched_index, matched_barcode);
+         }
+      }
+   }
+};
+
+Result Match(const Config &config, const RVec<double> &jet_pt, const RVec<double> &jet_eta,
+             const RVec<double> &jet_phi, const RVec<double> &jet_e, const RVec<int> &jet_matched_parton_barcode,
+             const RVec<int> &jet_matched_fsr_barcode, const RVec<double> &parton_pt, const RVec<double> &parton_eta,
+             const RVec<double> &parton_phi, const RVec<double> &parton_e, const RVec<int> &parton_barcode,
+             const RVec<int> &parton_pdgid, const RVec<int> &parton_gluino_barcode,
+             const RVec<int> &parton_neutralino_barcode, const RVec<double> &fsr_pt, const RVec<double> &fsr_eta,
+             const RVec<double> &fsr_phi, const RVec<double> &fsr_e, const RVec<int> &fsr_barcode,
+             const RVec<int> &fsr_pdgid, const RVec<int> &fsr_gluino_barcode, const RVec<int> &fsr_neutralino_barcode,
+             const RVec<int> &fsr_quark_barcode)
+{
+   const Particles partons{parton_pt, parton_eta, parton_phi, parton_e, parton_barcode, parton_pdgid,
+                           parton_gluino_barcode, parton_neutralino_barcode, parton_barcode};
+   const Particles fsrs{fsr_pt, fsr_eta, fsr_phi, fsr_e, fsr_barcode, fsr_pdgid,
+                        fsr_gluino_barcode, fsr_neutralino_barcode, fsr_quark_barcode};
+   EventMatcher matcher(config, jet_pt, jet_eta, jet_phi, jet_e, jet_matched_parton_barcode,
+                        jet_matched_fsr_barcode, partons, fsrs);
+   return matcher.Match();
+}
+
+} // namespace RPVMatching
+'''
+
+MATCHING_CRITERIA = {
+    'UseFTDeltaRvalues': 0,
+    'RecomputeDeltaRvalues_drPriority': 1,
+    'RecomputeDeltaRvalues_ptPriority': 2,
+    }
+
+# Output columns (prefix + name) in MATCH_FIELDS order
+# (match types are stored as codes: 0 (None), 1 (Parton), 2 (FSR))
+OUTPUT_COLUMNS = ('type', 'parton_index', 'pdgid', 'barcode', 'gluino_barcode', 'neutralino_barcode', 'neutralino') # noqa
+
+_declared = False
+
+
+def declare():
+    """ JIT-compile the C++ matcher (once) """
+    global _declared
+    if not _declared:
+        if not ROOT.gInterpreter.Declare(CPP_CODE):
+            logging.getLogger().fatal('C++ matcher could not be compiled, exiting') # noqa
+            sys.exit(1)
+        _declared = True
+
+
+class RPVRDataFrameMatcher():
+    """
+    Match jets to partons (and optionally FSRs) in an RDataFrame
+
+    define() adds one RVec column per jet decoration (see OUTPUT_COLUMNS),
+    computed with a C++ version of RPVMatcher. The matching runs inside
+    RDataFrame's event loop, i.e. on every thread slot when
+    ROOT.EnableImplicitMT() is used, and the new columns can be used in
+    further Define()/Filter() calls or be written with Snapshot().
+    """
+    __properties_defaults = MATCHING_PROPERTIES_DEFAULTS
+
+    def __init__(self, **kargs):
+        self.__log = logging.getLogger()
+        self.__properties = dict(self.__properties_defaults)
+        for key, value in kargs.items():
+            self.set_property(key, value)
+
+    def set_property(self, opt: str, value: Union[bool, float, str]):
+        if opt not in self.__properties_defaults:
+            self.__log.fatal(f'{opt} was not recognized, exiting')
+            sys.exit(1)
+        self.__properties[opt] = value
+
+    def __get_config_values(self) -> Tuple:
+        """ Values of the members of RPVMatching::Config (in order) """
+        prop = self.__properties
+        criteria = prop['MatchingCriteria']
+        if criteria not in MATCHING_CRITERIA:
+            self.__log.fatal(f'MatchingCriteria=={criteria} is not supported, exiting') # noqa
+            sys.exit(1)
+        non_default_cut = prop['DeltaRcut'] != self.__properties_defaults['DeltaRcut'] # noqa
+        if non_default_cut and 'RecomputeDeltaRvalues' not in criteria:
+            self.__log.fatal('DeltaRcut set but "RecomputeDeltaRvalues" not in MatchingCriteria, exiting') # noqa
+            sys.exit(1)
+        return (
+            MATCHING_CRITERIA[criteria],
+            float(prop['DeltaRcut']),
+            bool(prop['DisableNmatchedJetProtection']),
+            bool(prop['MatchJetsToMatchedQuarks']),
+            bool(prop['MatchFSRsFromMatchedGluinoDecays']),
+            int(prop['maxNmatchedJets']),
+            )
+
+    def get_config(self) -> str:
+        """ C++ expression constructing the configuration of the matcher """
+        values = [
+            str(value).lower() if isinstance(value, bool) else repr(value)
+            for value in self.__get_config_values()
+            ]
+        return f'RPVMatching::Config{{{", ".join(values)}}}'
+
+    def __get_arguments(self, columns: dict, fields: Tuple, size_column: str, name: str) -> [str]: # noqa
+        """ C++ arguments for every field (converted to RVec<double>/RVec<int>) """ # noqa
+        arguments = []
+        for field in fields:
+            if field in columns:
+                function = 'AsDouble' if field in ('pt', 'eta', 'phi', 'e') else 'AsInt' # noqa
+                arguments.append(f'RPVMatching::{function}({columns[field]})')
+            elif field in INPUT_DEFAULTS:
+                arguments.append(f'ROOT::VecOps::RVec<int>({size_column}.size(), {INPUT_DEFAULTS[field]})') # noqa
+            else:
+                self.__log.fatal(f'column for {name} {field} not provided, exiting') # noqa
+                sys.exit(1)
+        return arguments
+
+    def define(self, df, jets: dict, partons: dict, fsrs: dict = None, prefix: str = 'jet_match_'): # noqa
+        """
+        Add match decorations of every jet as new columns
+
+        jets/partons/fsrs: dict from field (see *_FIELDS in events.py) to
+        column name, e.g. {'pt': 'jet_pt', 'eta': 'jet_eta', ...}
+        """
+        declare()
+        arguments = self.__get_arguments(jets, JET_FIELDS, jets.get('pt', ''), 'jet') # noqa
+        arguments += self.__get_arguments(partons, PARTON_FIELDS, partons.get('pt', ''), 'parton') # noqa
+        if fsrs:
+            arguments += self.__get_arguments(fsrs, FSR_FIELDS, fsrs.get('pt', ''), 'FSR') # noqa
+        else:
+            arguments += ['ROOT::VecOps::RVec<double>()'] * 4 + ['ROOT::VecOps::RVec<int>()'] * 5 # noqa
+        result = f'{prefix}result'
+        df = df.Define(result, f'RPVMatching::Match({self.get_config()}, {", ".join(arguments)})') # noqa
+        members = ('match_type',) + OUTPUT_COLUMNS[1:]
+        for column, member in zip(OUTPUT_COLUMNS, members):
+            df = df.Define(f'{prefix}{column}', f'{result}.{member}')
+        return df
+
+    def get_output_columns(self, prefix: str = 'jet_match_') -> [str]:
+        return [f'{prefix}{column}' for column in OUTPUT_COLUMNS]
+
+    def match_event(self, event: dict):  # -> [MATCH_FIELDS] or EXIT
+        """ Match a plain event (see events.py) with the C++ matcher """
+        declare()
+        try:
+            values = self.__get_config_values()
+        except SystemExit:
+            return EXIT
+        config = ROOT.RPVMatching.Config()
+        config.criteria, config.dr_cut, config.disable_n_matched_jet_protection, config.match_jets_to_matched_quarks, config.match_fsrs_from_matched_gluino_decays, config.max_n_matched_jets = values # noqa
+        arguments = []
+        for key, fields in [('jets', JET_FIELDS), ('partons', PARTON_FIELDS), ('fsrs', FSR_FIELDS)]: # noqa
+            for field in fields:
+                values = [info.get(field, INPUT_DEFAULTS.get(field, -999)) for info in event[key]] # noqa
+                value_type = 'double' if field in ('pt', 'eta', 'phi', 'e') else 'int' # noqa
+                vector = ROOT.VecOps.RVec[value_type](len(values))
+                for index, value in enumerate(values):
+                    vector[index] = value
+                arguments.append(vector)
+        try:
+            result = ROOT.RPVMatching.Match(config, *arguments)
+        except Exception:  # std::runtime_error
+            return EXIT
+        infos = []
+        for index in range(len(event['jets'])):
+            if result.match_type[index] == 0:
+                infos.append(NOT_MATCHED)
+                continue
+            infos.append((
+                MATCH_TYPES[result.match_type[index]],
+                int(result.parton_index[index]),
+                int(result.pdgid[index]),
+                int(result.barcode[index]),
+                int(result.gluino_barcode[index]),
+                int(result.neutralino_barcode[index]),
+                bool(result.neutralino[index]),
+                ))
+        return infos
+
+
+def rdataframe_backend(cases: List[Tuple]) -> list:
+    """ Fuzzer backend (see fuzzer.py): C++ matcher called event by event """
+    outcomes = []
+    for properties, event in cases:
+        properties = dict(properties)
+        properties.pop('ReturnOnlyMatched', None)
+        properties.pop('Debug', None)
+        outcomes.append(RPVRDataFrameMatcher(**properties).match_event(event))
+    return outcomes
@@ -7,6 +7,7 @@
 import ROOT
 import sys
 import copy
+import time
 import logging
 from typing import Union, Tuple
 
@@ -16,11 +17,15 @@ class RPVJet(ROOT.TLorentzVector):
         ROOT.TLorentzVector.__init__(self)
         if len(args) == 4:
             self.SetPtEtaPhiE(args[0], args[1], args[2], args[3])
+        self.reset()
+
+    def reset(self):
+        """ Reset match decorations and truth barcodes (kinematics are kept) """
         self.__qgtagger_bdt = -999
         self.__is_matched = False
         self.__match_type = 'None'  # options: 'None', 'Parton', 'FSR'
         self.__match_parton_index = -1
-        self.__match_pdgID = -1
+        self.__match_pdgid = -1
         self.__match_barcode = -1
         self.__match_gluino_barcode = -1
         self.__match_neutralino_barcode = -1
@@ -102,6 +107,10 @@ class RPVParton(ROOT.TLorentzVector):
         ROOT.TLorentzVector.__init__(self)
         if len(args) == 4:
             self.SetPtEtaPhiE(args[0], args[1], args[2], args[3])
+        self.reset()
+
+    def reset(self):
+        """ Reset truth barcodes (kinematics are kept) """
         self.__quark_barcode = -999  # barcode of last quark in chain corresponding to this FSR # noqa
         self.__gluino_barcode = -999  # barcode of corresponding gluino
         self.__neutralino_barcode = -999  # barcode of corresponding neutralino (optional)
@@ -146,16 +155,23 @@ class RPVParton(ROOT.TLorentzVector):
         return self.__from_neutralino
 
 
+# Default values of the properties setting the matching decisions
+# (shared with the other matcher backends)
+MATCHING_PROPERTIES_DEFAULTS = {
+    'MatchingCriteria': 'RecomputeDeltaRvalues_drPriority',  # other options: 'UseFTDeltaRvalues', 'RecomputeDeltaRvalues_drPriority' # noqa
+    'DeltaRcut': 0.4,
+    'DisableNmatchedJetProtection': False,
+    'MatchJetsToMatchedQuarks': False,
+    'MatchFSRsFromMatchedGluinoDecays': False,
+    'maxNmatchedJets': 6
+    }
+
+
 class RPVMatcher():
     __properties_defaults = {
-        'MatchingCriteria': 'RecomputeDeltaRvalues_drPriority',  # other options: 'UseFTDeltaRvalues', 'RecomputeDeltaRvalues_drPriority' # noqa
-        'DeltaRcut': 0.4,
+        **MATCHING_PROPERTIES_DEFAULTS,
         'ReturnOnlyMatched': False,
         'Debug': False,
-        'DisableNmatchedJetProtection': False,
-        'MatchJetsToMatchedQuarks': False,
-        'MatchFSRsFromMatchedGluinoDecays': False,
-        'maxNmatchedJets': 6
         }
 
     def add_jets(self, jets: [RPVJet]):
@@ -172,10 +188,21 @@ class RPVMatcher():
             self.__log.fatal(f'{opt} was not recognized, exiting')
             sys.exit(1)
         self.__properties[opt] = value
+        for accumulator in self.__accumulators:
+            accumulator.set_config(self.__properties)
 
     def debug(self):
         self.set_property('Debug', True)
 
+    def add_latency_recorder(self, recorder):
+        """ Time every match() call and report it to recorder (see slow_events.py) """
+        self.__latency_recorder = recorder
+
+    def add_accumulator(self, accumulator):
+        """ Fill accumulator after every match() call (see accumulators.py) """
+        accumulator.set_config(self.__properties)
+        self.__accumulators.append(accumulator)
+
     def __get_parton_info(self, partons, barcode) -> Tuple:  # -> ("index", "pdgID", "gluino_barcode", "neutralino_barcode") # noqa
         """ Get info of quark from gluino matched to a jet """
         # Loop over quarks from gluinos
@@ -533,6 +560,7 @@ class RPVMatcher():
         # Set default properties
         for opt, default_value in self.__properties_defaults.items():
             self.__properties[opt] = default_value
+        self.__accumulators = []
         # Use provided settings
         if 'Jets' in kargs:
             self.__jets = kargs['Jets']
@@ -557,6 +585,7 @@ class RPVMatcher():
             self.__log.info('DisableNmatchedJetProtection property has been enabled') # noqa
         self.__matched_partons = []
         self.__matched_fsrs = {}
+        self.__latency_recorder = None
         self.__functions = {
             'RecomputeDeltaRvalues_ptPriority': self.__match_recompute_deltar_values, # noqa
             'RecomputeDeltaRvalues_drPriority': self.__match_recompute_deltar_values, # noqa
@@ -591,6 +620,23 @@ class RPVMatcher():
                 self.__check_info(index, fsr, 'FSR')
 
     def match(self) -> [RPVJet]:
+        if self.__latency_recorder is None:
+            jets = self.__match()
+        else:
+            start = time.perf_counter()
+            jets = self.__match()
+            self.__latency_recorder.fill(
+                time.perf_counter() - start,
+                self.__properties,
+                self.__jets,
+                self.__partons,
+                self.__fsrs
+                )
+        for accumulator in self.__accumulators:
+            accumulator.fill(self.__jets, self.__partons)
+        return jets
+
+    def __match(self) -> [RPVJet]:
         # Protection
         prop = self.__properties
         disable_njet_protection = prop['DisableNmatchedJetProtection']
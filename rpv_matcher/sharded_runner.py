@@ -0,0 +1,263 @@
+#########################################################################
+# Purpose: Run the matcher over a list of input files in resumable,     #
+#          checkpointed event-range shards                              #
+# Date:   19 October 2026                                               #
+#########################################################################
+
+import os
+import sys
+import json
+import sqlite3
+import logging
+import tempfile
+from typing import Callable, Iterable, List, Tuple, Union
+
+from rpv_matcher.rpv_matcher import RPVJet
+from rpv_matcher.rpv_matcher import RPVParton
+from rpv_matcher.rpv_matcher import RPVMatcher
+from rpv_matcher.accumulators import MatchingSummary
+
+# Reader signature: reader(file_name, first_event, last_event) -> iterable of
+# (jets, partons, fsrs) tuples, one per event in [first_event, last_event)
+Reader = Callable[[str, int, int], Iterable[Tuple[List[RPVJet], List[RPVParton], List[RPVParton]]]]  # noqa
+
+
+def read_manifest(manifest: str) -> [str]:
+    """ Read input files from a manifest (one file per line, '#' starts a comment) """
+    files = []
+    with open(manifest, 'r') as ifile:
+        for line in ifile:
+            line = line.split('#')[0].strip()
+            if line:
+                files.append(line)
+    return files
+
+
+def tree_entries_getter(tree_name: str) -> Callable[[str], int]:
+    """ Return a function providing the number of entries of tree_name in a ROOT file """
+    def get_n_events(file_name: str) -> int:
+        import ROOT
+        tfile = ROOT.TFile.Open(file_name)
+        if not tfile or tfile.IsZombie():
+            logging.getLogger().fatal(f'{file_name} could not be opened, exiting')
+            sys.exit(1)
+        tree = tfile.Get(tree_name)
+        if not tree:
+            logging.getLogger().fatal(f'{tree_name} not found in {file_name}, exiting')
+            sys.exit(1)
+        n_events = tree.GetEntries()
+        tfile.Close()
+        return n_events
+    return get_n_events
+
+
+def jet_match_info(jet: RPVJet) -> dict:
+    """ Get match decorations of a jet """
+    return {
+        'is_matched': jet.is_matched(),
+        'match_type': jet.get_match_type(),
+        'parton_index': jet.get_match_parton_index(),
+        'pdgid': jet.get_match_pdgid(),
+        'barcode': jet.get_match_barcode(),
+        'gluino_barcode': jet.get_match_gluino_barcode(),
+        'neutralino_barcode': jet.get_match_neutralino_barcode(),
+        'neutralino': jet.is_matched_to_neutralino(),
+        }
+
+
+def write_atomically(output_file_name: str, lines: Iterable[str]):
+    """ Write lines to a temporary file in the same directory and move it into place """
+    out_dir = os.path.dirname(os.path.abspath(output_file_name))
+    fd, tmp_name = tempfile.mkstemp(dir=out_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as ofile:
+            for line in lines:
+                ofile.write(line)
+            ofile.flush()
+            os.fsync(ofile.fileno())
+        os.replace(tmp_name, output_file_name)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+class ShardedRunner():
+    """
+    Match jets to partons for all events of all files in a manifest
+
+    Events are split in shards of at most events_per_shard events, every shard
+    is written to its own output file and recorded in a local SQLite
+    checkpoint database once finished, so a restarted job skips done shards.
+    merge() joins all shards into a single JSON-lines output in event order
+    and merges the MatchingSummary of every shard.
+    """
+    __checkpoint_name = 'checkpoint.sqlite'
+    __merged_name = 'matched.jsonl'
+    __summary_name = 'summary.json'
+
+    def __init__(
+            self,
+            manifest: Union[str, List[str]],
+            reader: Reader,
+            n_events_getter: Callable[[str], int],
+            output_dir: str,
+            events_per_shard: int = 10000,
+            properties: dict = None,
+            ):
+        self.__log = logging.getLogger()
+        if isinstance(manifest, str):
+            self.__files = read_manifest(manifest)
+        else:
+            self.__files = list(manifest)
+        if not self.__files:
+            self.__log.fatal('No input files were provided, exiting')
+            sys.exit(1)
+        if events_per_shard < 1:
+            self.__log.fatal(f'events_per_shard={events_per_shard} must be positive, exiting') # noqa
+            sys.exit(1)
+        self.__reader = reader
+        self.__n_events_getter = n_events_getter
+        self.__output_dir = output_dir
+        self.__shard_dir = os.path.join(output_dir, 'shards')
+        self.__events_per_shard = events_per_shard
+        self.__properties = dict(properties) if properties else dict()
+        os.makedirs(self.__shard_dir, exist_ok=True)
+        self.__db = sqlite3.connect(os.path.join(output_dir, self.__checkpoint_name)) # noqa
+        self.__init_db()
+
+    def __init_db(self):
+        """ Create checkpoint tables and make sure they belong to this job """
+        db = self.__db
+        db.execute('CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT)') # noqa
+        db.execute('CREATE TABLE IF NOT EXISTS files (file_index INTEGER PRIMARY KEY, file_name TEXT, n_events INTEGER)') # noqa
+        db.execute('CREATE TABLE IF NOT EXISTS shards (file_index INTEGER, first_event INTEGER, last_event INTEGER, output TEXT, PRIMARY KEY (file_index, first_event))') # noqa
+        config = {
+            'files': json.dumps(self.__files),
+            'events_per_shard': json.dumps(self.__events_per_shard),
+            'properties': json.dumps(self.__properties, sort_keys=True),
+            }
+        for key, value in config.items():
+            row = db.execute('SELECT value FROM config WHERE key = ?', (key,)).fetchone() # noqa
+            if row is None:
+                db.execute('INSERT INTO config VALUES (?, ?)', (key, value))
+            elif row[0] != value:
+                self.__log.fatal(f'{key} differs from the one recorded in the checkpoint database of {self.__output_dir}, exiting') # noqa
+                sys.exit(1)
+        db.commit()
+
+    def __get_n_events(self, file_index: int) -> int:
+        """ Get number of events of a file (cached in the checkpoint database) """
+        row = self.__db.execute('SELECT n_events FROM files WHERE file_index = ?', (file_index,)).fetchone() # noqa
+        if row is not None:
+            return row[0]
+        file_name = self.__files[file_index]
+        n_events = self.__n_events_getter(file_name)
+        self.__db.execute('INSERT INTO files VALUES (?, ?, ?)', (file_index, file_name, n_events)) # noqa
+        self.__db.commit()
+        return n_events
+
+    def get_shards(self) -> [Tuple]:  # -> [("file_index", "first_event", "last_event")] # noqa
+        """ Get all shards in event order """
+        shards = []
+        for file_index in range(len(self.__files)):
+            n_events = self.__get_n_events(file_index)
+            for first in range(0, n_events, self.__events_per_shard):
+                last = min(first + self.__events_per_shard, n_events)
+                shards.append((file_index, first, last))
+        return shards
+
+    def __shard_output(self, file_index: int, first_event: int) -> str:
+        return os.path.join(self.__shard_dir, f'shard_{file_index:05d}_{first_event:012d}.jsonl') # noqa
+
+    def __shard_summary(self, file_index: int, first_event: int) -> str:
+        return os.path.join(self.__shard_dir, f'shard_{file_index:05d}_{first_event:012d}_summary.json') # noqa
+
+    def is_done(self, shard: Tuple) -> bool:
+        """ Check if a shard was already processed """
+        file_index, first_event, last_event = shard
+        row = self.__db.execute(
+            'SELECT output FROM shards WHERE file_index = ? AND first_event = ? AND last_event = ?', # noqa
+            (file_index, first_event, last_event)
+            ).fetchone()
+        if row is None or not os.path.exists(row[0]):
+            return False
+        return os.path.exists(self.__shard_summary(file_index, first_event))
+
+    def __match_shard(self, shard: Tuple, summary: MatchingSummary):
+        """ Yield one JSON line with the matched jets of each event in the shard """
+        file_index, first_event, last_event = shard
+        file_name = self.__files[file_index]
+        matcher = RPVMatcher(**self.__properties)
+        matcher.add_accumulator(summary)
+        event_number = first_event
+        for jets, partons, fsrs in self.__reader(file_name, first_event, last_event): # noqa
+            if event_number >= last_event:
+                self.__log.fatal(f'reader provided more than {last_event - first_event} events for shard {shard}, exiting') # noqa
+                sys.exit(1)
+            matcher.add_jets(jets)
+            matcher.add_partons(partons)
+            matcher.add_fsrs(fsrs)
+            matched_jets = matcher.match()
+            event = {
+                'file': file_index,
+                'event': event_number,
+                'jets': [jet_match_info(jet) for jet in matched_jets],
+                }
+            yield json.dumps(event) + '\n'
+            event_number += 1
+        if event_number != last_event:
+            self.__log.fatal(f'reader provided {event_number - first_event} events instead of {last_event - first_event} for shard {shard}, exiting') # noqa
+            sys.exit(1)
+
+    def process_shard(self, shard: Tuple):
+        """ Match all events of a shard and record it in the checkpoint database """
+        file_index, first_event, last_event = shard
+        output = self.__shard_output(file_index, first_event)
+        self.__log.debug(f'Processing events [{first_event}, {last_event}) of {self.__files[file_index]}') # noqa
+        summary = MatchingSummary(self.__properties)
+        write_atomically(output, self.__match_shard(shard, summary))
+        write_atomically(self.__shard_summary(file_index, first_event), [json.dumps(summary.to_dict())]) # noqa
+        self.__db.execute(
+            'INSERT OR REPLACE INTO shards VALUES (?, ?, ?, ?)',
+            (file_index, first_event, last_event, output)
+            )
+        self.__db.commit()
+
+    def merge(self, output_file_name: str = None) -> str:
+        """ Join all shards into a single output in event order """
+        if output_file_name is None:
+            output_file_name = os.path.join(self.__output_dir, self.__merged_name) # noqa
+        shards = self.get_shards()
+        missing = [shard for shard in shards if not self.is_done(shard)]
+        if missing:
+            self.__log.fatal(f'{len(missing)} shards were not processed yet (first: {missing[0]}), exiting') # noqa
+            sys.exit(1)
+
+        def lines():
+            for file_index, first_event, _ in shards:
+                with open(self.__shard_output(file_index, first_event), 'r') as ifile: # noqa
+                    for line in ifile:
+                        yield line
+        write_atomically(output_file_name, lines())
+        summary = MatchingSummary(self.__properties)
+        for file_index, first_event, _ in shards:
+            summary.merge(MatchingSummary.load(self.__shard_summary(file_index, first_event))) # noqa
+        write_atomically(os.path.join(self.__output_dir, self.__summary_name), [json.dumps(summary.to_dict())]) # noqa
+        return output_file_name
+
+    def run(self) -> str:
+        """ Process all shards not processed yet and merge them """
+        shards = self.get_shards()
+        n_done = 0
+        for shard in shards:
+            if self.is_done(shard):
+                n_done += 1
+                continue
+            self.process_shard(shard)
+        if n_done:
+            self.__log.info(f'{n_done} of {len(shards)} shards were already processed, skipped') # noqa
+        return self.merge()
+
+    def close(self):
+        self.__db.close()
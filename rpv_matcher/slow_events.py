@@ -0,0 +1,146 @@
+#########################################################################
+# Purpose: Per-event latency histogram, capture of the slowest events   #
+#          and replay of captured events under a profiler               #
+# Date:   19 October 2026                                               #
+#########################################################################
+
+import sys
+import json
+import math
+import heapq
+import logging
+import argparse
+import cProfile
+import pstats
+from typing import List, Tuple
+
+from rpv_matcher.rpv_matcher import RPVJet
+from rpv_matcher.rpv_matcher import RPVParton
+from rpv_matcher.rpv_matcher import RPVMatcher
+from rpv_matcher.events import event_from_objects
+from rpv_matcher.events import event_to_objects
+from rpv_matcher.events import get_match_info
+
+
+class LatencyRecorder():
+    """
+    Keep a histogram of match() latencies and the inputs of the slowest events
+
+    Usage: matcher.add_latency_recorder(recorder)
+    Histogram bins are logarithmic (bins_per_decade) between min_latency and
+    max_latency seconds, with under/overflow in the first/last bin.
+    Inputs are only converted to plain events when an event enters the list
+    of the n_slowest events so far, which keeps the overhead small.
+    """
+    def __init__(
+            self,
+            n_slowest: int = 10,
+            min_latency: float = 1e-6,
+            max_latency: float = 10,
+            bins_per_decade: int = 10
+            ):
+        self.__n_slowest = n_slowest
+        self.__min_latency = min_latency
+        self.__bins_per_decade = bins_per_decade
+        n_bins = math.ceil(math.log10(max_latency / min_latency) * bins_per_decade) # noqa
+        self.__counts = [0] * (n_bins + 2)  # under/overflow
+        self.__n_events = 0
+        self.__slowest = []  # heap of (seconds, event_number, entry)
+
+    def fill(
+            self,
+            seconds: float,
+            properties: dict,
+            jets: [RPVJet],
+            partons: [RPVParton],
+            fsrs: [RPVParton]
+            ):
+        if seconds < self.__min_latency:
+            index = 0
+        else:
+            index = min(int(math.log10(seconds / self.__min_latency) * self.__bins_per_decade) + 1, len(self.__counts) - 1) # noqa
+        self.__counts[index] += 1
+        self.__n_events += 1
+        if len(self.__slowest) < self.__n_slowest:
+            heapq.heappush(self.__slowest, self.__capture(seconds, properties, jets, partons, fsrs)) # noqa
+        elif self.__n_slowest and seconds > self.__slowest[0][0]:
+            heapq.heapreplace(self.__slowest, self.__capture(seconds, properties, jets, partons, fsrs)) # noqa
+
+    def __capture(self, seconds, properties, jets, partons, fsrs) -> Tuple:
+        entry = {
+            'seconds': seconds,
+            'event_number': self.__n_events - 1,
+            'properties': dict(properties),
+            'event': event_from_objects(jets, partons, fsrs),
+            }
+        return seconds, self.__n_events - 1, entry
+
+    def get_bin_edges(self) -> [float]:
+        """ Lower edges of the histogram bins (first bin is the underflow) """
+        edges = [0.0]
+        for index in range(len(self.__counts) - 1):
+            edges.append(self.__min_latency * 10 ** (index / self.__bins_per_decade)) # noqa
+        return edges
+
+    def get_counts(self) -> [int]:
+        return list(self.__counts)
+
+    def get_n_events(self) -> int:
+        return self.__n_events
+
+    def get_slowest(self) -> [dict]:
+        """ Captured events, slowest first """
+        return [entry for _, _, entry in sorted(self.__slowest, reverse=True)]
+
+    def save(self, file_name: str):
+        """ Write histogram and slowest events to a JSON replay file """
+        with open(file_name, 'w') as ofile:
+            json.dump({
+                'bin_edges': self.get_bin_edges(),
+                'counts': self.get_counts(),
+                'slowest': self.get_slowest(),
+                }, ofile)
+
+
+def load_replay(file_name: str) -> List[dict]:
+    """ Get captured events (slowest first) from a replay file """
+    with open(file_name, 'r') as ifile:
+        return json.load(ifile)['slowest']
+
+
+def replay(entry: dict, profile: bool = True, trace: bool = True, sort: str = 'cumulative') -> list: # noqa
+    """ Re-run a captured event (optionally under cProfile and with Debug decisions tracing) """ # noqa
+    jets, partons, fsrs = event_to_objects(entry['event'])
+    matcher = RPVMatcher(Jets=jets, Partons=partons, FSRs=fsrs, **entry['properties']) # noqa
+    if trace:
+        matcher.set_property('Debug', True)
+    if profile:
+        profiler = cProfile.Profile()
+        matched_jets = profiler.runcall(matcher.match)
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats(sort).print_stats(25) # noqa
+    else:
+        matched_jets = matcher.match()
+    return [get_match_info(jet) for jet in matched_jets]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay events captured by LatencyRecorder') # noqa
+    parser.add_argument('replay_file')
+    parser.add_argument('--rank', type=int, default=0, help='0 is the slowest captured event') # noqa
+    parser.add_argument('--sort', default='cumulative', help='pstats sort key')
+    parser.add_argument('--no-trace', action='store_true', help='do not enable Debug decision tracing') # noqa
+    args = parser.parse_args()
+    logging.basicConfig(level='INFO', format='%(levelname)s: %(message)s')
+    log = logging.getLogger()
+    entries = load_replay(args.replay_file)
+    if not 0 <= args.rank < len(entries):
+        log.fatal(f'rank {args.rank} not available ({len(entries)} events captured), exiting') # noqa
+        sys.exit(1)
+    entry = entries[args.rank]
+    log.info(f'Replaying event {entry["event_number"]} (captured latency: {entry["seconds"] * 1e3:.3f} ms)') # noqa
+    for index, info in enumerate(replay(entry, trace=not args.no_trace, sort=args.sort)): # noqa
+        log.info(f'Jet {index}: {info}')
+
+
+if __name__ == '__main__':
+    main()
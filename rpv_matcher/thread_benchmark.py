@@ -0,0 +1,95 @@
+#########################################################################
+# Purpose: Measure how RPVBatchMatcher scales with NumThreads           #
+# Date:   19 October 2026                                               #
+#########################################################################
+
+import time
+import argparse
+import numpy as np
+from typing import Sequence
+
+from rpv_matcher.batched import get_offsets
+from rpv_matcher.batched import RPVEventBatch
+from rpv_matcher.batched import RPVBatchMatcher
+
+
+def make_batch(n_events: int, n_jets: int = 8, n_partons: int = 6, n_fsrs: int = 2, seed: int = 0) -> RPVEventBatch: # noqa
+    """
+    Random batch with n_jets jets, n_partons partons and n_fsrs FSRs per event
+    (every parton/FSR has a jet close to it, the other jets are random)
+    """
+    rng = np.random.default_rng(seed)
+
+    def kinematics(n_objects):
+        pt = rng.uniform(20, 300, n_objects)
+        eta = rng.uniform(-2.5, 2.5, n_objects)
+        phi = rng.uniform(-np.pi, np.pi, n_objects)
+        return {'pt': pt, 'eta': eta, 'phi': phi, 'e': pt * np.cosh(eta)}
+
+    def truth(n_per_event, barcodes):
+        n_objects = n_events * n_per_event
+        info = kinematics(n_objects)
+        info['barcode'] = np.tile(barcodes, n_events)
+        info['pdgid'] = rng.choice([1, 2, 3, 4, 5], n_objects)
+        info['gluino_barcode'] = np.tile(100 + np.arange(n_per_event) % 2, n_events) # noqa
+        return info
+    partons = truth(n_partons, np.arange(1, n_partons + 1))
+    fsrs = truth(n_fsrs, np.arange(1, n_fsrs + 1))
+    fsrs['quark_barcode'] = np.tile(np.arange(n_fsrs) % n_partons + 1, n_events) # noqa
+    jets = kinematics(n_events * n_jets)
+    jets['matched_parton_barcode'] = np.full(n_events * n_jets, -1)
+    jets['matched_fsr_barcode'] = np.full(n_events * n_jets, -1)
+    # jets close to (and matched by FT to) partons and FSRs
+    for source, n_sources, first, key in [(partons, n_partons, 0, 'matched_parton_barcode'), (fsrs, n_fsrs, n_partons, 'matched_fsr_barcode')]: # noqa
+        for index in range(min(n_sources, n_jets - first)):
+            jet = np.arange(n_events) * n_jets + first + index
+            target = np.arange(n_events) * n_sources + index
+            jets[key][jet] = source['barcode'][target]
+            jets['eta'][jet] = source['eta'][target] + rng.normal(0, 0.15, n_events) # noqa
+            jets['phi'][jet] = np.mod(source['phi'][target] + rng.normal(0, 0.15, n_events) + np.pi, 2 * np.pi) - np.pi # noqa
+    return RPVEventBatch(
+        jets,
+        get_offsets(np.full(n_events, n_jets)),
+        partons,
+        get_offsets(np.full(n_events, n_partons)),
+        fsrs,
+        get_offsets(np.full(n_events, n_fsrs)),
+        )
+
+
+def benchmark(batch: RPVEventBatch, threads: Sequence[int] = (1, 2, 4, 8), repeat: int = 3, **properties) -> dict: # noqa
+    """ Best time (in seconds) out of repeat match() calls for every number of threads """ # noqa
+    timings = {}
+    for n_threads in threads:
+        matcher = RPVBatchMatcher(**properties, NumThreads=n_threads)
+        best = np.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            matcher.match(batch)
+            best = min(best, time.perf_counter() - start)
+        timings[n_threads] = best
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure how RPVBatchMatcher scales with NumThreads') # noqa
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--criteria', default='RecomputeDeltaRvalues_drPriority') # noqa
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    batch = make_batch(args.events)
+    timings = benchmark(
+        batch,
+        args.threads,
+        args.repeat,
+        MatchingCriteria=args.criteria,
+        DisableNmatchedJetProtection=True,
+        )
+    print(f'{args.criteria}, {args.events} events')
+    for n_threads, seconds in timings.items():
+        print(f'{n_threads:>3} threads: {seconds:.3f} s ({timings[args.threads[0]] / seconds:.2f}x)') # noqa
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+from rpv_matcher import fuzzer
+
+
+def make_tester_event() -> dict:
+    """ Same jets, partons and FSRs as tester.py (as a plain event, see events.py) """ # noqa
+    jets = [
+        {'pt': 35, 'eta': 0, 'phi': 1.2, 'e': 35, 'matched_parton_barcode': -1, 'matched_fsr_barcode': -1}, # noqa
+        {'pt': 25, 'eta': 0, 'phi': 0.25, 'e': 25, 'matched_parton_barcode': 2, 'matched_fsr_barcode': -1}, # noqa
+        {'pt': 21, 'eta': 0, 'phi': 3.1, 'e': 21, 'matched_parton_barcode': -1, 'matched_fsr_barcode': 1}, # noqa
+        {'pt': 20, 'eta': 0, 'phi': 3, 'e': 20, 'matched_parton_barcode': -1, 'matched_fsr_barcode': 2}, # noqa
+        ]
+    partons = [
+        {'pt': 40, 'eta': 0, 'phi': 1, 'e': 40, 'barcode': 1, 'pdgid': 1, 'gluino_barcode': 1, 'neutralino_barcode': -999}, # noqa
+        {'pt': 20, 'eta': 0, 'phi': 0.2, 'e': 20, 'barcode': 2, 'pdgid': 3, 'gluino_barcode': 1, 'neutralino_barcode': -999}, # noqa
+        ]
+    fsrs = [
+        {'pt': 22, 'eta': 0, 'phi': 3.2, 'e': 22, 'barcode': 1, 'pdgid': 1, 'gluino_barcode': 1, 'neutralino_barcode': -999, 'quark_barcode': 3}, # noqa
+        {'pt': 20, 'eta': 0, 'phi': 3, 'e': 20, 'barcode': 2, 'pdgid': 1, 'gluino_barcode': 1, 'neutralino_barcode': -999, 'quark_barcode': 3}, # noqa
+        ]
+    return {'jets': jets, 'partons': partons, 'fsrs': fsrs}
+
+
+def make_parton(phi: float, barcode: int, pdgid: int = 1, gluino_barcode: int = 1, **info) -> dict: # noqa
+    """ Parton (or FSR if quark_barcode is provided) with pt=e=20 and eta=0 """ # noqa
+    return dict({'pt': 20, 'eta': 0, 'phi': phi, 'e': 20, 'barcode': barcode, 'pdgid': pdgid, 'gluino_barcode': gluino_barcode, 'neutralino_barcode': -999}, **info) # noqa
+
+
+def make_jet(phi: float, matched_parton_barcode: int = -1, matched_fsr_barcode: int = -1, pt: float = 30) -> dict: # noqa
+    """ Jet with e=pt and eta=0 """
+    return {'pt': pt, 'eta': 0, 'phi': phi, 'e': pt, 'matched_parton_barcode': matched_parton_barcode, 'matched_fsr_barcode': matched_fsr_barcode} # noqa
+
+
+def assert_agrees_with_reference(backend: str, seed: int, n_events: int = 2000): # noqa
+    """ Fuzz a backend (see fuzzer.py), reports hold the minimized mismatches """ # noqa
+    assert fuzzer.fuzz(backend, n_events, seed=seed, chunk_size=500) == []
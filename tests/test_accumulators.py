@@ -0,0 +1,111 @@
+import copy
+import pytest
+
+from rpv_matcher import fuzzer
+from rpv_matcher.events import event_to_objects
+from rpv_matcher.rpv_matcher import RPVMatcher
+from rpv_matcher.batched import RPVEventBatch
+from rpv_matcher.batched import RPVBatchMatcher
+from rpv_matcher.accumulators import MatchingSummary
+from rpv_matcher.accumulators import merge_summaries
+
+PROPERTIES = {'MatchingCriteria': 'UseFTDeltaRvalues', 'MatchFSRsFromMatchedGluinoDecays': True, 'DisableNmatchedJetProtection': True} # noqa
+
+
+def get_events(n_events):
+    """ Random events which can be matched with PROPERTIES """
+    events = []
+    index = 0
+    while len(events) < n_events:
+        _, event = fuzzer.generate_case(3, index)
+        index += 1
+        barcodes = [parton['barcode'] for parton in event['partons']]
+        fsr_barcodes = [fsr['barcode'] for fsr in event['fsrs']]
+        if len(set(barcodes)) != len(barcodes) or len(set(fsr_barcodes)) != len(fsr_barcodes): # noqa
+            continue
+        if any(jet['matched_parton_barcode'] not in barcodes + [-1] or jet['matched_fsr_barcode'] not in fsr_barcodes + [-1] for jet in event['jets']): # noqa
+            continue
+        if any(fsr['quark_barcode'] not in barcodes for fsr in event['fsrs']):
+            continue
+        events.append(event)
+    return events
+
+
+def test_object_and_batch_summaries_agree():
+    events = get_events(200)
+    summary = MatchingSummary(PROPERTIES)
+    matcher = RPVMatcher(**PROPERTIES)
+    matcher.add_accumulator(summary)
+    for event in events:
+        jets, partons, fsrs = event_to_objects(event)
+        matcher.add_jets(jets)
+        matcher.add_partons(partons)
+        matcher.add_fsrs(fsrs)
+        matcher.match()
+    # fill two batch summaries (as two workers would) and merge them
+    batch_summaries = []
+    for chunk in [events[:120], events[120:]]:
+        batch_summary = MatchingSummary(PROPERTIES)
+        batch_matcher = RPVBatchMatcher(**PROPERTIES)
+        batch_matcher.add_accumulator(batch_summary)
+        batch_matcher.match(RPVEventBatch.from_events(chunk))
+        batch_summaries.append(batch_summary)
+    merged = merge_summaries(batch_summaries)
+    assert len(merged) == 1
+    assert list(merged.values())[0].to_dict() == summary.to_dict()
+    assert summary.get('events') == 200
+    assert summary.get('fsr_matched_jets') > 0
+    fractions = summary.get_summary()
+    assert fractions['parton_fraction'] + fractions['fsr_fraction'] == pytest.approx(1) # noqa
+
+
+def test_save_and_load(tmp_path):
+    summary = MatchingSummary(PROPERTIES)
+    matcher = RPVMatcher(**PROPERTIES)
+    matcher.add_accumulator(summary)
+    for event in get_events(20):
+        jets, partons, fsrs = event_to_objects(event)
+        matcher.add_jets(jets)
+        matcher.add_partons(partons)
+        matcher.add_fsrs(fsrs)
+        matcher.match()
+    summary.save(str(tmp_path / 'summary.json'))
+    loaded = MatchingSummary.load(str(tmp_path / 'summary.json'))
+    assert loaded.to_dict() == summary.to_dict()
+    assert loaded.merge(summary).get('events') == 40
+
+
+def test_merged_summaries_do_not_share_counts():
+    def fill(summary, event):
+        matcher = RPVMatcher(**PROPERTIES)
+        matcher.add_accumulator(summary)
+        jets, partons, fsrs = event_to_objects(event)
+        matcher.add_jets(jets)
+        matcher.add_partons(partons)
+        matcher.add_fsrs(fsrs)
+        matcher.match()
+    events = get_events(2)
+    summary = MatchingSummary(PROPERTIES)
+    fill(summary, events[0])
+    before = copy.deepcopy(summary.to_dict())
+    merged, = merge_summaries([summary]).values()
+    fill(merged, events[1])
+    assert merged.get('events') == 2
+    assert summary.to_dict() == before
+
+
+def test_different_configurations_can_not_be_merged():
+    with pytest.raises(SystemExit):
+        MatchingSummary(PROPERTIES).merge(MatchingSummary())
+
+
+def test_configuration_is_taken_from_the_matcher():
+    summary = MatchingSummary()
+    matcher = RPVMatcher(MatchingCriteria='UseFTDeltaRvalues')
+    matcher.add_accumulator(summary)
+    assert summary.get_config()['MatchingCriteria'] == 'UseFTDeltaRvalues'
+    batch_summary = MatchingSummary()
+    RPVBatchMatcher(MatchingCriteria='UseFTDeltaRvalues', NumThreads=2).add_accumulator(batch_summary) # noqa
+    assert batch_summary.get_config() == summary.get_config()
+    with pytest.raises(SystemExit):
+        RPVMatcher().add_accumulator(MatchingSummary(PROPERTIES))
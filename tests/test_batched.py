@@ -0,0 +1,157 @@
+import pytest
+import numpy as np
+
+from rpv_matcher import events
+from rpv_matcher.batched import RPVEventBatch
+from rpv_matcher.batched import RPVBatchMatcher
+from rpv_matcher.batched import measure_precision_effects
+from rpv_matcher.batched import MATCH_PARTON, MATCH_FSR, MATCH_NONE
+from rpv_matcher.events import NOT_MATCHED
+from rpv_matcher.events import match_event
+
+from backend_cases import make_jet
+from backend_cases import make_parton
+from backend_cases import make_tester_event
+from backend_cases import assert_agrees_with_reference
+
+
+def make_events():
+    return [make_tester_event()] * 3
+
+
+def test_use_ft_deltar_values():
+    batch = RPVEventBatch.from_events(make_events())
+    result = RPVBatchMatcher(MatchingCriteria='UseFTDeltaRvalues').match(batch)
+    for index in range(batch.get_n_events()):
+        first = batch.jet_offsets[index]
+        match_type = result.match_type[first:first + 4].tolist()
+        assert match_type == [MATCH_NONE, MATCH_PARTON, MATCH_FSR, MATCH_NONE]
+        assert result.barcode[first:first + 4].tolist() == [-1, 2, 3, -1]
+
+
+def test_unknown_barcode_exits():
+    events = make_events()
+    events[1] = dict(events[1], jets=[dict(events[1]['jets'][0], matched_parton_barcode=7)]) # noqa
+    batch = RPVEventBatch.from_events(events)
+    with pytest.raises(SystemExit):
+        RPVBatchMatcher(MatchingCriteria='UseFTDeltaRvalues').match(batch)
+
+
+def test_duplicated_barcodes_use_first_parton():
+    # RPVMatcher takes the first parton/FSR with the barcode of the FT match
+    event = {
+        'jets': [make_jet(0.5, matched_parton_barcode=5), make_jet(-1, matched_fsr_barcode=7)], # noqa
+        'partons': [make_parton(0.5, 5, 1, 101), make_parton(2, 5, 2, 102)],
+        'fsrs': [make_parton(-1, 7, 21, 103, quark_barcode=9), make_parton(-2, 7, 22, 104, quark_barcode=9)], # noqa
+        }
+    batch = RPVEventBatch.from_events([make_tester_event(), event, event])
+    result = RPVBatchMatcher(MatchingCriteria='UseFTDeltaRvalues', DisableNmatchedJetProtection=True).match(batch) # noqa
+    for index in [1, 2]:
+        assert result.event(index) == [
+            ('Parton', 0, 1, 5, 101, -999, False),
+            ('FSR', 0, 21, 9, 103, -999, False),
+            ]
+
+
+def test_64_bit_barcodes():
+    # RPVMatcher accepts any barcode, in joins and decorations
+    barcode = 2**40
+    event = {
+        'jets': [make_jet(0.5, matched_parton_barcode=barcode + 1), make_jet(-1, matched_fsr_barcode=-barcode)], # noqa
+        'partons': [make_parton(0.5, barcode + 1, 1, barcode + 2, neutralino_barcode=barcode + 3)], # noqa
+        'fsrs': [make_parton(-1, -barcode, 21, barcode + 2, quark_barcode=barcode + 4)], # noqa
+        }
+    batch = RPVEventBatch.from_events([event, make_tester_event()])
+    for criteria in ['UseFTDeltaRvalues', 'RecomputeDeltaRvalues_drPriority']: # noqa
+        result = RPVBatchMatcher(MatchingCriteria=criteria, DisableNmatchedJetProtection=True).match(batch) # noqa
+        assert result.event(0) == [
+            ('Parton', 0, 1, barcode + 1, barcode + 2, barcode + 3, True),
+            ('FSR', 0, 21, barcode + 4, barcode + 2, -999, False),
+            ]
+
+
+def test_batched_agrees_with_reference():
+    assert_agrees_with_reference('batched', seed=2)
+
+
+def test_compact_dtype_policy():
+    batch = RPVEventBatch.from_events(make_events())
+    compact = batch.astype('Compact')
+    assert compact.jets['pt'].dtype == np.float32
+    assert compact.partons['pdgid'].dtype == np.int16
+    assert compact.get_nbytes() < batch.get_nbytes()
+    matcher = RPVBatchMatcher(MatchingCriteria='UseFTDeltaRvalues', DtypePolicy='Compact') # noqa
+    result = matcher.match(compact)
+    assert result.match_type.dtype == np.uint8
+    assert not result.differs(RPVBatchMatcher(MatchingCriteria='UseFTDeltaRvalues').match(batch)).any() # noqa
+    counts = measure_precision_effects(batch, {'DeltaRcut': 0.5})
+    assert counts['jets'] == 12
+    assert counts['changed_jets'] == 0
+    assert counts['pairs'] == 3 * 4 * (2 + 2)
+    # pair at the default DeltaRcut, which is not used by 'UseFTDeltaRvalues'
+    batch = RPVEventBatch.from_events([{'jets': [make_jet(0.6)], 'partons': [make_parton(1, 1)], 'fsrs': []}]) # noqa
+    counts = measure_precision_effects(batch, {'DisableNmatchedJetProtection': True}) # noqa
+    assert counts['pairs_near_cut'] == 1
+    counts = measure_precision_effects(batch, {'MatchingCriteria': 'UseFTDeltaRvalues', 'DisableNmatchedJetProtection': True}) # noqa
+    assert counts['pairs'] == 1
+    assert counts['pairs_near_cut'] == 0
+    assert counts['cut_flips'] == 0
+
+
+def test_threaded_agrees_with_reference():
+    assert_agrees_with_reference('threaded', seed=5)
+
+
+@pytest.fixture
+def fallback_calls(monkeypatch) -> list:
+    """ Events matched again with RPVMatcher by RPVBatchMatcher """
+    calls = []
+
+    def counted_match_event(event, properties):
+        calls.append(event)
+        return match_event(event, properties)
+    monkeypatch.setattr(events, 'match_event', counted_match_event)
+    return calls
+
+
+def test_threaded_deltar_tie_falls_back_to_reference(fallback_calls):
+    # Both (identical) jets are closest to the first FSR at the same DeltaR,
+    # RPVMatcher gives the FSR to the second jet (the first one keeps it only
+    # if it is strictly closer), decided with RPVMatcher by every thread
+    event = {
+        'jets': [make_jet(1.1, pt=40), make_jet(1.1, pt=40)],
+        'partons': [make_parton(-2, 1)],
+        'fsrs': [make_parton(1, 1, 21, 101, quark_barcode=3), make_parton(2.5, 2, 22, 101, quark_barcode=3)], # noqa
+        }
+    batch = RPVEventBatch.from_events([event, make_tester_event()] * 4)
+    matcher = RPVBatchMatcher(MatchingCriteria='RecomputeDeltaRvalues_drPriority', DisableNmatchedJetProtection=True, NumThreads=2) # noqa
+    result = matcher.match(batch)
+    assert [call['jets'][0]['phi'] for call in fallback_calls].count(1.1) == 4
+    for index in [0, 2, 4, 6]:
+        assert result.event(index) == [NOT_MATCHED, ('FSR', 0, 21, 3, 101, -999, False)] # noqa
+
+
+def test_forward_deltar_near_cut_falls_back_to_reference(fallback_calls):
+    # Recomputed eta values of forward objects can differ from the libm ones
+    # by ~1E-10, more than this DeltaR differs from DeltaRcut
+    event = {
+        'jets': [dict(make_jet(2.7275, pt=40), eta=6.3808)],
+        'partons': [dict(make_parton(2.7275, 1), eta=6.7808)],
+        'fsrs': [],
+        }
+    properties = {'MatchingCriteria': 'RecomputeDeltaRvalues_drPriority', 'DisableNmatchedJetProtection': True} # noqa
+    result = RPVBatchMatcher(**properties).match(RPVEventBatch.from_events([event])) # noqa
+    assert len(fallback_calls) == 1
+    assert result.event(0) == match_event(event, properties)
+
+
+def test_threads_write_to_shared_result():
+    batch = RPVEventBatch.from_events(make_events() * 10)
+    results = [
+        RPVBatchMatcher(MatchingCriteria='RecomputeDeltaRvalues_ptPriority', NumThreads=n_threads).match(batch) # noqa
+        for n_threads in [1, 4]
+        ]
+    assert not results[0].differs(results[1]).any()
+    view = results[1].get_events(3, 5)
+    view.unset_matches(np.arange(len(view.match_type)))
+    assert not results[1].is_matched()[batch.jet_offsets[3]:batch.jet_offsets[5]].any() # noqa
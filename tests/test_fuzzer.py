@@ -0,0 +1,46 @@
+from rpv_matcher import fuzzer
+from rpv_matcher.events import NOT_MATCHED
+
+
+def broken_backend(cases):
+    """ Reference backend which never matches jets to FSRs """
+    outcomes = fuzzer.reference_backend(cases)
+    return [
+        [NOT_MATCHED if info[0] == 'FSR' else info for info in outcome]
+        if isinstance(outcome, list) else outcome
+        for outcome in outcomes
+        ]
+
+
+def crashing_backend(cases):
+    """ Reference backend which raises for events with FSRs """
+    if any(event['fsrs'] for _, event in cases):
+        raise RuntimeError('FSRs are not supported')
+    return fuzzer.reference_backend(cases)
+
+
+def test_reference_agrees_with_itself():
+    assert fuzzer.fuzz('reference', 300, seed=1, chunk_size=100) == []
+
+
+def test_mismatches_are_minimized(monkeypatch):
+    monkeypatch.setitem(fuzzer.BACKENDS, 'broken', 'test_fuzzer:broken_backend') # noqa
+    reports = fuzzer.fuzz('broken', 300, seed=1, chunk_size=100)
+    assert reports
+    for report in reports:
+        event = report['event']
+        assert report['reference'] != report['candidate']
+        # a single FSR (and a jet matched to it, plus at most one jet
+        # blocking the parton it would match otherwise) is enough
+        assert len(event['jets']) <= 2
+        assert len(event['fsrs']) == 1
+
+
+def test_crashes_are_reported(monkeypatch):
+    monkeypatch.setitem(fuzzer.BACKENDS, 'crashing', 'test_fuzzer:crashing_backend') # noqa
+    reports = fuzzer.fuzz('crashing', 100, seed=1, chunk_size=50)
+    assert reports
+    for report in reports:
+        assert report['candidate'] == f'{fuzzer.CRASH}: RuntimeError: FSRs are not supported' # noqa
+        assert len(report['event']['jets']) == 1
+        assert len(report['event']['fsrs']) == 1
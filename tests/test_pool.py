@@ -0,0 +1,43 @@
+import numpy as np
+
+from rpv_matcher import fuzzer
+from rpv_matcher.events import EXIT
+from rpv_matcher.events import match_event
+from rpv_matcher.events import get_match_info
+from rpv_matcher.pool import RPVObjectPool
+from rpv_matcher.rpv_matcher import RPVMatcher
+
+
+def columns(infos, fields):
+    return [np.array([info[field] for info in infos]) for field in fields]
+
+
+def match_with_pool(pool, event, properties):
+    """ Same as rpv_matcher.events.match_event() but with pooled objects """
+    kinematics = ['pt', 'eta', 'phi', 'e']
+    truth = ['barcode', 'pdgid', 'gluino_barcode']
+    jets = pool.fill_jets(*columns(event['jets'], kinematics + ['matched_parton_barcode', 'matched_fsr_barcode'])) # noqa
+    partons = pool.fill_partons(*columns(event['partons'], kinematics + truth + ['neutralino_barcode'])) # noqa
+    fsrs = pool.fill_fsrs(*columns(event['fsrs'], kinematics + truth + ['quark_barcode', 'neutralino_barcode'])) # noqa
+    try:
+        matcher = RPVMatcher(Jets=jets, Partons=partons, FSRs=fsrs, **dict(properties, ReturnOnlyMatched=False)) # noqa
+        matched_jets = matcher.match()
+    except SystemExit:
+        return EXIT
+    return [get_match_info(jet) for jet in matched_jets]
+
+
+def test_pooled_objects_give_same_decisions():
+    pool = RPVObjectPool()
+    first_jet = None
+    for index in range(300):
+        properties, event = fuzzer.generate_case(4, index)
+        assert match_with_pool(pool, event, properties) == match_event(event, properties) # noqa
+        jets = pool.get_jets(1)
+        if first_jet is None:
+            first_jet = jets[0]
+        assert jets[0] is first_jet
+        assert not jets[0].is_matched()
+        assert jets[0].get_matched_parton_barcode() == -1
+    # objects are only constructed for the largest multiplicities
+    assert pool.get_size() == {'jets': 8, 'partons': 6, 'fsrs': 4}
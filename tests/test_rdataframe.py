@@ -0,0 +1,56 @@
+import ROOT
+
+from rpv_matcher.events import JET_FIELDS
+from rpv_matcher.events import PARTON_FIELDS
+from rpv_matcher.events import FSR_FIELDS
+from rpv_matcher.events import NOT_MATCHED
+from rpv_matcher.rdataframe import RPVRDataFrameMatcher
+
+from backend_cases import make_jet
+from backend_cases import make_parton
+from backend_cases import make_tester_event
+from backend_cases import assert_agrees_with_reference
+
+
+def make_dataframe(event: dict, n_entries: int = 4):
+    """ RDataFrame with the same event (see events.py) in every entry """
+    df = ROOT.RDataFrame(n_entries)
+    for key, prefix, fields in [('jets', 'jet', JET_FIELDS), ('partons', 'parton', PARTON_FIELDS), ('fsrs', 'fsr', FSR_FIELDS)]: # noqa
+        for field in fields:
+            value_type = 'float' if field in ('pt', 'eta', 'phi', 'e') else 'int' # noqa
+            values = ', '.join(str(info[field]) for info in event[key])
+            df = df.Define(f'{prefix}_{field}', f'ROOT::VecOps::RVec<{value_type}>{{{values}}}') # noqa
+    return df
+
+
+def test_rdataframe_use_ft_deltar_values():
+    jets = {field: f'jet_{field}' for field in JET_FIELDS}
+    partons = {field: f'parton_{field}' for field in PARTON_FIELDS}
+    fsrs = {field: f'fsr_{field}' for field in FSR_FIELDS}
+    matcher = RPVRDataFrameMatcher(MatchingCriteria='UseFTDeltaRvalues')
+    df = matcher.define(make_dataframe(make_tester_event()), jets, partons, fsrs) # noqa
+    columns = df.AsNumpy(['jet_match_type', 'jet_match_barcode'])
+    for match_type, barcode in zip(columns['jet_match_type'], columns['jet_match_barcode']): # noqa
+        assert list(match_type) == [0, 1, 2, 0]
+        assert list(barcode) == [-1, 2, 3, -1]
+
+
+def test_rdataframe_fsr_pt_tie():
+    # Identical jets matched to FSRs radiated from the same quark: on equal pt
+    # RPVMatcher gives the quark to the jet compared last
+    event = {
+        'jets': [make_jet(1, matched_fsr_barcode=1), make_jet(1, matched_fsr_barcode=2)], # noqa
+        'partons': [make_parton(-2, 1)],
+        'fsrs': [make_parton(1, 1, 21, quark_barcode=3), make_parton(1.1, 2, 22, quark_barcode=3)], # noqa
+        }
+    expected = {
+        'UseFTDeltaRvalues': [NOT_MATCHED, ('FSR', 1, 22, 3, 1, -999, False)], # noqa
+        'RecomputeDeltaRvalues_ptPriority': [NOT_MATCHED, ('FSR', 0, 21, 3, 1, -999, False)], # noqa
+        }
+    for criteria, infos in expected.items():
+        matcher = RPVRDataFrameMatcher(MatchingCriteria=criteria, DisableNmatchedJetProtection=True) # noqa
+        assert matcher.match_event(event) == infos
+
+
+def test_rdataframe_agrees_with_reference():
+    assert_agrees_with_reference('rdataframe', seed=3)
@@ -0,0 +1,66 @@
+import json
+import pytest
+
+from rpv_matcher.rpv_matcher import RPVJet
+from rpv_matcher.rpv_matcher import RPVParton
+from rpv_matcher.sharded_runner import ShardedRunner
+
+N_EVENTS = {'file_a.root': 5, 'file_b.root': 3}
+
+
+def make_event(event_number):
+    """ One jet matching parton 0 and one unmatched jet """
+    jets = [RPVJet(), RPVJet()]
+    jets[0].SetPtEtaPhiE(40, 0, 1, 40)
+    jets[1].SetPtEtaPhiE(30, 0, -2, 30)
+    partons = [RPVParton()]
+    partons[0].SetPtEtaPhiE(40, 0, 1.05, 40)
+    partons[0].set_gluino_barcode(1)
+    partons[0].set_barcode(event_number + 1)
+    partons[0].set_pdgid(1)
+    return jets, partons, []
+
+
+class Reader():
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.calls = []
+
+    def __call__(self, file_name, first_event, last_event):
+        self.calls.append((file_name, first_event))
+        if (file_name, first_event) == self.fail_at:
+            raise RuntimeError('node pre-empted')
+        for event_number in range(first_event, last_event):
+            yield make_event(event_number)
+
+
+def test_sharded_runner_resumes(tmp_path):
+    files = list(N_EVENTS)
+    reader = Reader(fail_at=('file_b.root', 0))
+    runner = ShardedRunner(files, reader, N_EVENTS.get, str(tmp_path), events_per_shard=2) # noqa
+    with pytest.raises(RuntimeError):
+        runner.run()
+    runner.close()
+    assert not list((tmp_path / 'shards').glob('*.tmp'))
+
+    # Restart: only the file_b shards are processed again
+    reader = Reader()
+    runner = ShardedRunner(files, reader, N_EVENTS.get, str(tmp_path), events_per_shard=2) # noqa
+    output = runner.run()
+    runner.close()
+    assert reader.calls == [('file_b.root', 0), ('file_b.root', 2)]
+
+    with open(output, 'r') as ifile:
+        events = [json.loads(line) for line in ifile]
+    assert [(event['file'], event['event']) for event in events] == [
+        (0, 0), (0, 1), (0, 2), (0, 3), (0, 4), (1, 0), (1, 1), (1, 2)
+        ]
+    for event in events:
+        assert event['jets'][0]['match_type'] == 'Parton'
+        assert event['jets'][0]['barcode'] == event['event'] + 1
+        assert not event['jets'][1]['is_matched']
+
+    with open(tmp_path / 'summary.json', 'r') as ifile:
+        summary = json.load(ifile)
+    assert summary['counts']['events'] == 8
+    assert summary['counts']['events_all_partons_matched'] == 8
@@ -0,0 +1,39 @@
+from rpv_matcher.rpv_matcher import RPVJet
+from rpv_matcher.rpv_matcher import RPVParton
+from rpv_matcher.rpv_matcher import RPVMatcher
+from rpv_matcher.slow_events import LatencyRecorder
+from rpv_matcher.slow_events import load_replay
+from rpv_matcher.slow_events import replay
+
+
+def make_event(n_jets):
+    jets = [RPVJet(40 - index, 0, 0.1 * index, 40) for index in range(n_jets)]
+    partons = [RPVParton(40, 0, 0.05, 40)]
+    partons[0].set_gluino_barcode(1)
+    partons[0].set_barcode(1)
+    partons[0].set_pdgid(1)
+    return jets, partons
+
+
+def test_slowest_events_are_captured_and_replayed(tmp_path):
+    recorder = LatencyRecorder(n_slowest=2)
+    matcher = RPVMatcher()
+    matcher.add_latency_recorder(recorder)
+    for n_jets in range(1, 6):
+        jets, partons = make_event(n_jets)
+        matcher.add_jets(jets)
+        matcher.add_partons(partons)
+        matcher.match()
+    assert recorder.get_n_events() == 5
+    assert sum(recorder.get_counts()) == 5
+    slowest = recorder.get_slowest()
+    assert len(slowest) == 2
+    assert slowest[0]['seconds'] >= slowest[1]['seconds']
+
+    replay_file = str(tmp_path / 'replay.json')
+    recorder.save(replay_file)
+    entries = load_replay(replay_file)
+    assert entries == slowest
+    matched = replay(entries[0], profile=True, trace=True)
+    assert len(matched) == len(entries[0]['event']['jets'])
+    assert matched[0][0] == 'Parton'
@@ -0,0 +1,11 @@
+from rpv_matcher.batched import RPVBatchMatcher
+from rpv_matcher.thread_benchmark import make_batch
+from rpv_matcher.thread_benchmark import benchmark
+
+
+def test_benchmark():
+    batch = make_batch(100, seed=1)
+    result = RPVBatchMatcher(MatchingCriteria='UseFTDeltaRvalues').match(batch)
+    assert result.is_matched().sum() == 100 * 6
+    timings = benchmark(batch, threads=(1, 2), repeat=1, DisableNmatchedJetProtection=True) # noqa
+    assert list(timings) == [1, 2]